@@ -0,0 +1,38 @@
+##############################################################################
+#
+# Copyright (c) 2017 Shoobx, Inc.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Benchmarks
+
+The benchmarks are scripts, run them like
+``python -m shoobx.rml2odt.benchmarks.serializers``.
+"""
+import glob
+import logging
+import os
+
+from shoobx.rml2odt.tests import corpus
+
+
+def getCorpus():
+    """The RML documents of the test corpus, without the blacklisted ones."""
+    paths = sorted(glob.glob(os.path.join(corpus.INPUT_DIR, '*.rml')))
+    paths.extend(
+        path for path in sorted(glob.glob(
+            os.path.join(corpus.Z3C_RML_INPUT_DIR, '*.rml')))
+        if os.path.basename(path) not in corpus.Z3C_RML_BLACKLIST)
+    return paths
+
+
+def silenceWarnings():
+    # z3c.rml warns about every directive we do not support.
+    logging.getLogger('z3c.rml').setLevel(logging.ERROR)
@@ -0,0 +1,157 @@
+##############################################################################
+#
+# Copyright (c) 2017 Shoobx, Inc.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Measure the conversion throughput of the whole test corpus
+
+The corpus is converted ``--repeat`` times in one process. The results can
+be saved as JSON and compared with the saved results of an earlier run;
+the exit status is 1 if the throughput regressed by more than
+``--threshold``.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import z3c.rml
+
+from shoobx.rml2odt import benchmarks, rml2odt
+
+# The default tolerated slowdown, relative to the baseline.
+THRESHOLD = 0.1
+
+# Metrics where a bigger value is a regression, the others regress when
+# they get smaller.
+SLOWER_IF_BIGGER = ('p50', 'p95')
+
+
+def percentile(values, percent):
+    """The nearest-rank percentile of ``values``."""
+    values = sorted(values)
+    rank = max(int(round(percent / 100 * len(values) + 0.5)), 1)
+    return values[min(rank, len(values)) - 1]
+
+
+def loadCorpus(paths):
+    corpus = []
+    for path in paths:
+        with open(path, 'rb') as rmlinput:
+            corpus.append((path, rmlinput.read()))
+    return corpus
+
+
+def measure(corpus, repeat=3, format=None):
+    """Convert every document ``repeat`` times and return the results.
+
+    Documents failing to convert are left out, their paths are listed
+    under ``failed``.
+    """
+    latencies = []
+    output = 0
+    failed = []
+    for i in range(repeat):
+        for path, rml in corpus:
+            if path in failed:
+                continue
+            start = time.perf_counter()
+            try:
+                data = rml2odt.convertToBytes(
+                    rml, filename=path, format=format)
+            except Exception:
+                failed.append(path)
+                continue
+            latencies.append(time.perf_counter() - start)
+            output += len(data)
+    elapsed = sum(latencies)
+    return {
+        'documents': len(corpus) - len(failed),
+        'repeat': repeat,
+        'docs_per_sec': len(latencies) / elapsed if elapsed else 0,
+        'p50': percentile(latencies, 50) if latencies else 0,
+        'p95': percentile(latencies, 95) if latencies else 0,
+        'bytes_out': output // repeat,
+        'failed': failed,
+    }
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """Return the descriptions of the metrics regressed beyond threshold."""
+    regressions = []
+    for name in ('docs_per_sec',) + SLOWER_IF_BIGGER:
+        old, new = baseline.get(name), results[name]
+        if not old:
+            continue
+        change = new / old - 1
+        if name not in SLOWER_IF_BIGGER:
+            change = -change
+        if change > threshold:
+            regressions.append('{}: {:.4g} -> {:.4g} ({:+.1%})'.format(
+                name, old, new, new / old - 1))
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        'paths', nargs='*', metavar='path',
+        help='RML documents, by default the test corpus')
+    parser.add_argument(
+        '-n', '--repeat', type=int, default=3,
+        help='Number of times the corpus is converted')
+    parser.add_argument(
+        '-f', '--format', choices=sorted(rml2odt.writer.FORMATS),
+        help='Output format, odt by default')
+    parser.add_argument(
+        '-o', '--output', metavar='JSON',
+        help='Save the results to this file')
+    parser.add_argument(
+        '-b', '--baseline', metavar='JSON',
+        help='Compare the results with the results saved in this file')
+    parser.add_argument(
+        '-t', '--threshold', type=float, default=THRESHOLD,
+        help='Tolerated relative regression, default %(default)s')
+    pargs = parser.parse_args(args)
+    benchmarks.silenceWarnings()
+
+    corpus = loadCorpus(pargs.paths or benchmarks.getCorpus())
+    # Warm up the per-process caches, then measure.
+    measure(corpus, 1, pargs.format)
+    results = measure(corpus, pargs.repeat, pargs.format)
+    results['python'] = platform.python_version()
+    results['z3c.rml'] = getattr(z3c.rml, '__version__', None)
+
+    for path in results['failed']:
+        print('{}: failed'.format(os.path.basename(path)), file=sys.stderr)
+    print('{documents} documents x {repeat}: {docs_per_sec:.1f} docs/s, '
+          'p50 {p50_ms:.1f}ms, p95 {p95_ms:.1f}ms, {bytes_out} bytes out'
+          .format(p50_ms=results['p50'] * 1000,
+                  p95_ms=results['p95'] * 1000, **results))
+
+    if pargs.output:
+        with open(pargs.output, 'w') as out:
+            json.dump(results, out, indent=2, sort_keys=True)
+    if pargs.baseline:
+        with open(pargs.baseline) as base:
+            baseline = json.load(base)
+        regressions = compare(results, baseline, pargs.threshold)
+        for regression in regressions:
+            print('Regression ' + regression)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
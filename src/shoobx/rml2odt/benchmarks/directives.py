@@ -0,0 +1,217 @@
+##############################################################################
+#
+# Copyright (c) 2017 Shoobx, Inc.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Benchmark the conversion of synthetic documents per directive family
+
+Every scenario generates an RML document exercising one family of
+directives. ``Directives`` follows the conventions of airspeed velocity
+(asv), which reports the time and peak memory of every scenario; running
+this module does the same without asv.
+"""
+import argparse
+import gc
+import statistics
+import sys
+import timeit
+import tracemalloc
+
+from shoobx.rml2odt import benchmarks, rml2odt
+
+DOCUMENT = """<!DOCTYPE document SYSTEM "rml.dtd">
+<document filename="benchmark.pdf">
+  <template>
+    <pageTemplate id="main">
+      <frame id="first" x1="1cm" y1="1cm" width="19cm" height="26cm"/>
+    </pageTemplate>
+  </template>
+  <stylesheet>
+    <paraStyle name="Emphasis" fontName="Helvetica-Bold" fontSize="12"
+               textColor="blue"/>
+    <listStyle name="Square" start="square" bulletFontName="Helvetica"/>
+    <blockTableStyle id="Grid">
+      <blockBackground colorName="lightgrey" start="0,0" stop="-1,0"/>
+      <blockRowBackground colorNames="white,whitesmoke" start="0,1"
+                          stop="-1,-1"/>
+      <blockFont name="Helvetica-Bold" start="0,0" stop="-1,0"/>
+      <blockAlignment value="right" start="1,1" stop="-1,-1"/>
+      <lineStyle kind="GRID" colorName="black" start="0,0" stop="-1,-1"/>
+      <lineStyle kind="OUTLINE" colorName="black" thickness="2"/>
+      %(styles)s
+    </blockTableStyle>
+  </stylesheet>
+  <story>
+    %(story)s
+  </story>
+</document>"""
+
+IMAGE = '[shoobx.rml2odt]/tests/test_data/input/shoobx.png'
+
+
+def makeDocument(story, styles=''):
+    return DOCUMENT % {'story': story, 'styles': styles}
+
+
+def paragraphs(count=300):
+    """Paragraphs with inline markup, i.e. ``Paragraph.addSpan``."""
+    return makeDocument(''.join(
+        '<para style="%s">Paragraph %d with <b>bold</b>, <i>italic and '
+        '<b>both</b></i>, <font color="red" size="14">red</font>, '
+        '<u>underlined</u> and <a href="https://example.com/%d">linked'
+        '</a> text.<br/>A second line.</para>\n'
+        % ('Emphasis' if i % 3 else 'Normal', i, i)
+        for i in range(count)))
+
+
+def _rows(rows, cols):
+    return ''.join(
+        '<tr>%s</tr>\n' % ''.join(
+            '<td>%d.%d</td>' % (row, col) for col in range(cols))
+        for row in range(rows))
+
+
+def blockTable(rows=200, cols=6):
+    """A styled table, i.e. ``BlockTable.getStyleMap``."""
+    return makeDocument(
+        '<blockTable style="Grid">%s</blockTable>' % _rows(rows, cols))
+
+
+def blockTableSpans(rows=200, cols=6):
+    """A styled table with a span in every tenth row."""
+    spans = ''.join(
+        '<blockSpan start="0,%d" stop="2,%d"/>' % (row, row)
+        for row in range(0, rows, 10))
+    return makeDocument(
+        '<blockTable style="Grid">%s</blockTable>' % _rows(rows, cols),
+        styles=spans)
+
+
+def bulkData(rows=1000, cols=6):
+    """A table from comma separated ``bulkData``."""
+    data = '\n'.join(
+        ','.join('%d.%d' % (row, col) for col in range(cols))
+        for row in range(rows))
+    return makeDocument(
+        '<blockTable style="Grid"><bulkData><![CDATA[\n%s\n]]></bulkData>'
+        '</blockTable>' % data)
+
+
+def sparseTable(rows=500, cols=20):
+    """A wide table, mostly empty cells and empty padding rows."""
+    return makeDocument(
+        '<blockTable style="Grid">%s</blockTable>' % ''.join(
+            '<tr><td>%s</td>%s</tr>\n' % (
+                row if row % 5 == 0 else '', '<td/>' * (cols - 1))
+            for row in range(rows)))
+
+
+def lists(count=20, depth=3, items=4):
+    """Nested ``ul`` and ``ol`` lists, i.e. ``registerListStyle``."""
+    def makeList(level):
+        tag = 'ol' if level % 2 else 'ul'
+        style = ' style="Square"' if level == 1 else ''
+        entries = []
+        for item in range(items):
+            entries.append('<li><para>Item %d.%d</para></li>' % (
+                level, item))
+        if level < depth:
+            entries.append('<li>%s</li>' % makeList(level + 1))
+        return '<%s%s>%s</%s>' % (tag, style, ''.join(entries), tag)
+    return makeDocument('\n'.join(makeList(0) for i in range(count)))
+
+
+def images(count=100):
+    """The same image over and over again, in the story and in cells."""
+    return makeDocument(
+        ''.join('<img src="%s" width="20mm" height="8mm"/>\n' % IMAGE
+                for i in range(count // 2)) +
+        '<blockTable>%s</blockTable>' % ''.join(
+            '<tr><td>Row %d</td><td><img src="%s" width="20mm" '
+            'height="8mm"/></td></tr>\n' % (i, IMAGE)
+            for i in range(count - count // 2)))
+
+
+def barcodes(count=40):
+    """QR codes, half of them repeated."""
+    return makeDocument(''.join(
+        '<barCodeFlowable code="QR" value="https://example.com/%d"/>\n'
+        % (i % (count // 2))
+        for i in range(count)))
+
+
+SCENARIOS = {
+    'paragraphs': paragraphs,
+    'blockTable': blockTable,
+    'blockTableSpans': blockTableSpans,
+    'bulkData': bulkData,
+    'sparseTable': sparseTable,
+    'lists': lists,
+    'images': images,
+    'barcodes': barcodes,
+}
+
+
+class Directives(object):
+    """asv benchmarks, one parameter value per scenario."""
+
+    params = sorted(SCENARIOS)
+    param_names = ['scenario']
+
+    def setup(self, scenario):
+        benchmarks.silenceWarnings()
+        self.rml = SCENARIOS[scenario]()
+        # Fill the per-process caches, as in a long running process.
+        rml2odt.convertToBytes(self.rml)
+
+    def time_convert(self, scenario):
+        rml2odt.convertToBytes(self.rml)
+
+    def peakmem_convert(self, scenario):
+        rml2odt.convertToBytes(self.rml)
+
+
+def measure(rml, repeat=5):
+    """Convert ``rml`` and return the run times and the peak memory."""
+    rml2odt.convertToBytes(rml)
+    times = timeit.repeat(
+        lambda: rml2odt.convertToBytes(rml), repeat=repeat, number=1)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        rml2odt.convertToBytes(rml)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        'scenarios', nargs='*', metavar='scenario',
+        help='Scenarios to run, by default all of: %s'
+             % ', '.join(sorted(SCENARIOS)))
+    parser.add_argument(
+        '-n', '--repeat', type=int, default=5,
+        help='Number of timed runs per scenario')
+    pargs = parser.parse_args(args)
+    benchmarks.silenceWarnings()
+
+    for name in pargs.scenarios or sorted(SCENARIOS):
+        times, peak = measure(SCENARIOS[name](), pargs.repeat)
+        print('{:<16} min {:8.1f}ms  median {:8.1f}ms  peak {:7.1f}MB'.format(
+            name, min(times) * 1000, statistics.median(times) * 1000,
+            peak / 1024 / 1024))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
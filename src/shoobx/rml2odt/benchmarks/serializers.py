@@ -0,0 +1,86 @@
+##############################################################################
+#
+# Copyright (c) 2017 Shoobx, Inc.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Compare the XML serializers of the package writer
+
+Every document is converted once, then only writing the package is timed
+with each serializer; the best of ``--repeat`` runs counts.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import lxml.etree
+
+from shoobx.rml2odt import benchmarks, document, writer
+
+
+def timeSerializers(path, serializers, repeat):
+    with open(path, 'rb') as rmlinput:
+        root = lxml.etree.parse(rmlinput).getroot()
+    doc = document.Document(root)
+    doc.filename = path
+    doc.process(io.BytesIO())
+    timings = {}
+    for serializer in serializers:
+        best = None
+        for i in range(repeat):
+            start = time.perf_counter()
+            writer.writeDocument(doc.document, io.BytesIO(), serializer)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[serializer] = best
+    return timings
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        'paths', nargs='*', metavar='path',
+        help='RML documents, by default the test corpus')
+    parser.add_argument(
+        '-n', '--repeat', type=int, default=5,
+        help='Number of runs per document and serializer')
+    parser.add_argument(
+        '-v', '--verbose', action='store_true',
+        help='Print the timings of every document')
+    pargs = parser.parse_args(args)
+    benchmarks.silenceWarnings()
+
+    serializers = sorted(writer.SERIALIZERS)
+    totals = dict.fromkeys(serializers, 0)
+    for path in pargs.paths or benchmarks.getCorpus():
+        try:
+            timings = timeSerializers(path, serializers, pargs.repeat)
+        except Exception as err:
+            print('{}: skipped, {}'.format(path, err), file=sys.stderr)
+            continue
+        for serializer, elapsed in timings.items():
+            totals[serializer] += elapsed
+        if pargs.verbose:
+            print('{:<50} {}'.format(
+                os.path.basename(path)[:50],
+                ' '.join('{}={:8.2f}ms'.format(serializer, elapsed * 1000)
+                         for serializer, elapsed in timings.items())))
+
+    reference = totals[document.Document.serializer]
+    for serializer in serializers:
+        print('{:<10} {:10.1f}ms {:6.2f}x'.format(
+            serializer, totals[serializer] * 1000,
+            reference / totals[serializer] if totals[serializer] else 0))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+##############################################################################
+#
+# Copyright (c) 2017 Shoobx, Inc.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Benchmark the fixed cost of converting a document
+
+Every document pays for setting up the ODF document and its default styles
+before the first directive is processed. The per-process caches are filled
+first, as in a long running process. ``Startup`` follows the conventions of
+airspeed velocity (asv), like ``directives.Directives``.
+"""
+import argparse
+import statistics
+import sys
+import timeit
+
+from odf.opendocument import OpenDocumentText
+
+from shoobx.rml2odt import benchmarks, document, rml2odt
+
+EMPTY = """<!DOCTYPE document SYSTEM "rml.dtd">
+<document filename="empty.pdf">
+  <template>
+    <pageTemplate id="main">
+      <frame id="first" x1="1cm" y1="1cm" width="19cm" height="26cm"/>
+    </pageTemplate>
+  </template>
+  <stylesheet/>
+  <story/>
+</document>"""
+
+HELLO = EMPTY.replace('<story/>', '<story><para>Hello World</para></story>')
+
+
+def registerDefaultStyles():
+    """Add the default styles to a new ODF document."""
+    doc = document.Document(None)
+    doc.document = OpenDocumentText()
+    doc.registerDefaultStyles()
+
+
+def emptyDocument():
+    """Convert a document without any content."""
+    rml2odt.convertToBytes(EMPTY)
+
+
+def helloWorld():
+    """Convert a document with a single paragraph."""
+    rml2odt.convertToBytes(HELLO)
+
+
+SCENARIOS = {
+    'registerDefaultStyles': registerDefaultStyles,
+    'emptyDocument': emptyDocument,
+    'helloWorld': helloWorld,
+}
+
+
+class Startup(object):
+    """asv benchmarks, one parameter value per scenario."""
+
+    params = sorted(SCENARIOS)
+    param_names = ['scenario']
+
+    def setup(self, scenario):
+        benchmarks.silenceWarnings()
+        SCENARIOS[scenario]()
+
+    def time_startup(self, scenario):
+        SCENARIOS[scenario]()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        'scenarios', nargs='*', metavar='scenario',
+        help='Scenarios to run, by default all of: %s'
+             % ', '.join(sorted(SCENARIOS)))
+    parser.add_argument(
+        '-n', '--repeat', type=int, default=5,
+        help='Number of timed runs per scenario')
+    parser.add_argument(
+        '--number', type=int, default=20,
+        help='Number of calls per timed run')
+    pargs = parser.parse_args(args)
+    benchmarks.silenceWarnings()
+
+    for name in pargs.scenarios or sorted(SCENARIOS):
+        scenario = SCENARIOS[name]
+        scenario()
+        times = [elapsed / pargs.number for elapsed in timeit.repeat(
+            scenario, repeat=pargs.repeat, number=pargs.number)]
+        print('{:<24} min {:8.2f}ms  median {:8.2f}ms'.format(
+            name, min(times) * 1000, statistics.median(times) * 1000))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
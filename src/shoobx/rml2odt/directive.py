@@ -16,6 +16,8 @@
 import lxml
 from z3c.rml import directive
 
+from shoobx.rml2odt.profiler import getProfiler
+
 
 class NotImplementedDirective(directive.RMLDirective):
 
@@ -24,9 +26,47 @@ class NotImplementedDirective(directive.RMLDirective):
             'Directive not implemented: %s' % self.element.tag)
 
 
-class BaseDirective(directive.RMLDirective):
+def processDirective(handler, tag, profiler=None):
+    # The sub-directives of ``handler`` get the profiler from it.
+    handler.profiler = profiler
+    if profiler is None:
+        handler.process()
+    else:
+        profiler.process(handler, tag)
+
+
+class RMLDirective(directive.RMLDirective):
+    """z3c.rml's directive, processing sub-directives with the profiler."""
+
+    def processSubDirectives(self, select=None, ignore=None):
+        profiler = getProfiler(self)
+        # Go through all children of the directive and try to process them.
+        for element in self.element.getchildren():
+            # Ignore all comments
+            if isinstance(element, lxml.etree._Comment):
+                continue
+            # Raise an error/log any unknown directive.
+            if element.tag not in self.factories:
+                msg = "Directive %r could not be processed and was " \
+                      "ignored. %s" % (
+                        element.tag, directive.getFileInfo(self, element))
+                # Record any tags/elements that could not be processed.
+                directive.logger.warning(msg)
+                if directive.ABORT_ON_INVALID_DIRECTIVE:
+                    raise ValueError(msg)
+                continue
+            if select is not None and element.tag not in select:
+                continue
+            if ignore is not None and element.tag in ignore:
+                continue
+            handler = self.factories[element.tag](element, self)
+            processDirective(handler, element.tag, profiler)
+
+
+class BaseDirective(RMLDirective):
 
     def processSubDirectives(self, select=None, ignore=None):
+        profiler = getProfiler(self)
         # Go through all children of the directive and try to process them.
         for element in self.element.getchildren():
             tag = element.tag
@@ -50,4 +90,4 @@ class BaseDirective(directive.RMLDirective):
             if ignore is not None and tag in ignore:
                 continue
             handler = self.factories[tag](element, self)
-            handler.process()
+            processDirective(handler, tag, profiler)
@@ -13,16 +13,26 @@
 ##############################################################################
 """RML ``document`` element
 """
+import collections
+import functools
+import hashlib
+import mimetypes
+import os
 
+import odf.style
 import zope.interface
-from odf.opendocument import OpenDocumentText
+from odf.attrconverters import make_NCName
+from odf.element import Node
+from odf.namespaces import STYLENS
+from odf.opendocument import IS_IMAGE, OpenDocumentText
 from reportlab.lib import styles
 from z3c.rml import attr, directive
 from z3c.rml import document as rml_document
 from z3c.rml import interfaces as rml_interfaces
 
 # Import modules, so their directives get registered.
-from shoobx.rml2odt import list, stylesheet, table, template
+from shoobx.rml2odt import directive as odt_directive
+from shoobx.rml2odt import list, profiler, stylesheet, table, template, writer
 
 RMLSTYLE_HANDLERS = {
     styles.ParagraphStyle: stylesheet.registerParagraphStyle,
@@ -30,6 +40,48 @@ RMLSTYLE_HANDLERS = {
 }
 
 
+# ``elements`` maps element names like ``text:p`` to the number of elements
+# in the document; ``automaticStyles`` and ``commonStyles`` count the styles,
+# including automatic styles left out of the output because they are not
+# used; ``styleNames`` is the number of style names generated per prefix;
+# ``parts`` maps the package members to their uncompressed size and
+# ``size`` is the size of the output, both in bytes.
+ConversionStats = collections.namedtuple(
+    'ConversionStats', ['elements', 'automaticStyles', 'commonStyles',
+                        'styleNames', 'parts', 'size'])
+
+
+def countElements(node):
+    """The number of elements per name in the tree of ``node``."""
+    counts = collections.Counter()
+    nodes = [node]
+    while nodes:
+        node = nodes.pop()
+        counts[node.tagName] += 1
+        nodes.extend(child for child in node.childNodes
+                     if child.nodeType == Node.ELEMENT_NODE)
+    return counts
+
+
+@functools.lru_cache(maxsize=None)
+def getDefaultStyles():
+    """The ODF styles of the RML sample stylesheet.
+
+    They are the same for every document, so they are built only once
+    per process. Do not modify the result, ``Document.registerDefaultStyles``
+    adds clones of it to the documents.
+    """
+    defaults = Document(None)
+    defaults.document = OpenDocumentText()
+    for name, style in stylesheet.SampleStyleSheet.byName.items():
+        handler = RMLSTYLE_HANDLERS.get(style.__class__)
+        if handler is None:
+            continue
+        odtStyle = handler(defaults, name, style)
+        defaults.odtStyles[name] = odtStyle
+    return defaults
+
+
 class ColorDefinition(directive.RMLDirective):
     signature = rml_document.IColorDefinition
 
@@ -44,7 +96,7 @@ class ColorDefinition(directive.RMLDirective):
             manager.colors[attrs['id']] = attrs['CMYK']
 
 
-class DocInit(directive.RMLDirective):
+class DocInit(odt_directive.RMLDirective):
     signature = rml_document.IDocInit
     factories = {
         # 'name': special.Name,
@@ -79,7 +131,7 @@ class DocInit(directive.RMLDirective):
 
 
 @zope.interface.implementer(rml_interfaces.IManager)
-class Document(directive.RMLDirective):
+class Document(odt_directive.RMLDirective):
     signature = rml_document.IDocument
 
     factories = {
@@ -91,12 +143,34 @@ class Document(directive.RMLDirective):
         # 'frame': template.Frame
         }
 
+    # The XML serializer used to write the package, see
+    # ``writer.SERIALIZERS``.
+    serializer = 'odfpy'
+    # The output format, see ``writer.FORMATS``.
+    format = 'odt'
+    # Record the processing of directives in ``profiler``, see
+    # ``profiler.DirectiveProfiler``.
+    profile = False
+    # Lists with the same attributes share their list style. Converting to
+    # DOCX continues the numbering of lists sharing a style, set this to
+    # False to give every list its own style.
+    shareListStyles = True
+
     def __init__(self, element):
         super().__init__(element, None)
         self.names = {}
         self.styles = {}
         self.odtStyles = {}
         self.styleCounters = {}
+        self.internedStyles = {}
+        self.styleElements = {}
+        self.fontFaces = set()
+        self.pictures = {}
+        # Rows for ``<bulkData source="name"/>`` by name, iterables or
+        # ``table.RowSource`` objects.
+        self.rowSources = {}
+        self.profiler = None
+        self.output = None
         self.colors = {}
         self.attributesCache = {}
         self.filename = '<unknown>'
@@ -107,18 +181,114 @@ class Document(directive.RMLDirective):
         self.styleCounters[prefix] += 1
         return prefix + str(self.styleCounters[prefix])
 
+    def addStyle(self, style, container=None):
+        """Add ``style`` to ``container``, ``automaticstyles`` by default.
+
+        Styles are indexed by name, so ``getStyle`` does not have to
+        search the containers.
+        """
+        if container is None:
+            container = self.document.automaticstyles
+        container.addElement(style)
+        # odfpy renames styles whose name is already taken.
+        self.styleElements[style.attributes[(STYLENS, 'name')]] = style
+
+    def removeStyle(self, style):
+        """Remove ``style`` from its container and from the index."""
+        style.parentNode.removeChild(style)
+        name = style.attributes[(STYLENS, 'name')]
+        if self.styleElements.get(name) is style:
+            del self.styleElements[name]
+
+    def getStyle(self, name):
+        """Return the style element called ``name`` or None."""
+        return self.styleElements.get(make_NCName(name))
+
+    def addFontFace(self, fontName):
+        """Declare the ODF font face for an RML font name.
+
+        Every font face is declared only once per document. Returns the
+        ODF font name.
+        """
+        odfFontName = stylesheet.rmlFont2odfFont(fontName)
+        if odfFontName not in self.fontFaces:
+            self.fontFaces.add(odfFontName)
+            self.document.fontfacedecls.addElement(
+                odf.style.FontFace(name=odfFontName, fontfamily=odfFontName))
+        return odfFontName
+
+    def addPicture(self, data, mediatype, digest=None):
+        """Add an image to the package and return its path in there.
+
+        Images are named by the SHA-1 ``digest`` of their data, so every
+        image is stored only once, no matter how often it is used.
+        """
+        if digest is None:
+            digest = hashlib.sha1(data).hexdigest()
+        href = self.pictures.get(digest)
+        if href is None:
+            extension = mimetypes.guess_extension(mediatype) or ''
+            href = 'Pictures/%s%s' % (digest, extension)
+            self.document.Pictures[href] = (IS_IMAGE, data, mediatype)
+            self.pictures[digest] = href
+        return href
+
+    def internStyle(self, prefix, key, factory, container=None):
+        """Return the name of the style registered for ``key``.
+
+        The style is only created the first time a given ``key`` is seen:
+        ``factory`` is called with a new style name and must return the
+        style element, which gets added to ``container``
+        (``automaticstyles`` by default). Later calls with an equal ``key``
+        reuse that style.
+        """
+        key = (prefix, key)
+        styleName = self.internedStyles.get(key)
+        if styleName is None:
+            styleName = self.getNextStyleName(prefix)
+            self.addStyle(factory(styleName), container)
+            self.internedStyles[key] = styleName
+        return styleName
+
+    def internStyleElement(self, prefix, klass, *props, **attributes):
+        """Return the name of an automatic style made of property elements.
+
+        The style is created by calling ``klass`` with a new name and
+        ``attributes`` and gets ``props`` added. Styles of the same
+        ``klass`` with equal attributes and properties are shared.
+        """
+        key = (klass, tuple(sorted(attributes.items()))) + tuple(
+            (prop.qname, tuple(sorted(prop.attributes.items())))
+            for prop in props)
+
+        def createStyle(name):
+            style = klass(name=name, **attributes)
+            for prop in props:
+                style.addElement(prop)
+            return style
+
+        return self.internStyle(prefix, key, createStyle)
+
     def registerDefaultStyles(self):
-        for name, style in stylesheet.SampleStyleSheet.byName.items():
-            handler = RMLSTYLE_HANDLERS.get(style.__class__)
-            if handler is None:
-                continue
-            odtStyle = handler(self.document, name, style)
-            self.odtStyles[name] = odtStyle
+        defaults = getDefaultStyles()
+        clones = {}
+        for container in ('fontfacedecls', 'automaticstyles'):
+            target = getattr(self.document, container)
+            for node in getattr(defaults.document, container).childNodes:
+                clones[id(node)] = clone = stylesheet.cloneNode(node)
+                target.addElement(clone)
+        for style in self.document.automaticstyles.childNodes:
+            self.styleElements[style.attributes[(STYLENS, 'name')]] = style
+        for name, odtStyle in defaults.odtStyles.items():
+            self.odtStyles[name] = clones.get(id(odtStyle))
+        self.fontFaces.update(defaults.fontFaces)
 
     def process(self, outputFile=None, maxPasses=2):
         """Process document"""
         # Initialize the ODT Document.
         self.document = OpenDocumentText()
+        if self.profile:
+            self.profiler = profiler.DirectiveProfiler(self.document)
         self.registerDefaultStyles()
         # Process common sub-directives
         self.processSubDirectives(select=('docinit',))
@@ -128,4 +298,24 @@ class Document(directive.RMLDirective):
             self.processSubDirectives(select=('stylesheet', 'template'))
             self.processSubDirectives(select=('story',))
         # Save the output.
-        self.document.save(outputFile)
+        write = writer.FORMATS[self.format]
+        if isinstance(outputFile, (str, os.PathLike)):
+            with open(outputFile, 'wb') as odtoutput:
+                self.output = write(self.document, odtoutput, self.serializer)
+        else:
+            self.output = write(self.document, outputFile, self.serializer)
+
+    def getStats(self):
+        """Return the ``ConversionStats`` of the processed document."""
+        odf = self.document
+        sizes = getattr(self.output, 'sizes', {})
+        return ConversionStats(
+            # odfpy's element_dict misses elements attached with
+            # appendChild, so walk the tree.
+            elements=dict(countElements(odf.topnode)),
+            automaticStyles=len(odf.automaticstyles.childNodes),
+            commonStyles=len(odf.styles.childNodes),
+            styleNames=dict(self.styleCounters),
+            parts={name: size for name, (size, compressedSize)
+                   in sizes.items()},
+            size=self.output.size)
@@ -14,8 +14,14 @@
 """Flowable Element Processing
 """
 import base64
+import functools
+import hashlib
+import io
+import mimetypes
 import os
 import re
+import struct
+import urllib.parse
 
 import lazy
 import lxml
@@ -30,10 +36,31 @@ from z3c.rml import attr
 from z3c.rml import flowable as rml_flowable
 from z3c.rml import interfaces, occurence
 
-from shoobx.rml2odt import directive, stylesheet
+from shoobx.rml2odt import directive, imagecache
 from shoobx.rml2odt.interfaces import IContentContainer
 
 
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'BM', 'image/bmp'),
+)
+
+
+def getImageMediaType(data, filename=None):
+    """Guess the media type of image data, by its content first."""
+    for signature, mediatype in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return mediatype
+    if filename:
+        mediatype = mimetypes.guess_type(filename)[0]
+        if mediatype:
+            return mediatype
+    return 'application/octet-stream'
+
+
 class Flowable(directive.BaseDirective):
     klass = None
     attrMapping = None
@@ -53,34 +80,71 @@ class Image(Flowable):
     klass = reportlab.platypus.flowables.Image
     attrMapping = {'src': 'filename', 'align': 'hAlign'}
 
+    # Resolves the source path like the ``src`` attribute, without reading.
+    srcPath = attr.File(doNotOpen=True)
+
     def process(self):
         manager = attr.getManager(self)
-        attrs = dict(self.getAttributeValues(attrMapping=self.attrMapping))
-        binary = self.element.attrib['src']
-        if ',' in binary:
-            # Embedded image
-            metaData, imageString = binary.split(',', 1)
+        # The source is loaded by getImage(), only if it is not cached.
+        attrs = dict(self.getAttributeValues(
+            ignore=('src',), attrMapping=self.attrMapping))
+        image = self.getImage()
+        self.addImage(manager, attrs, 'ImageFrame', image.data,
+                      image.mediatype, image.digest)
+
+    def getImageKey(self, src):
+        if ',' in src:
+            return ('data', hashlib.sha1(src.encode('utf-8')).hexdigest())
+        path = self.srcPath.bind(self).fromUnicode(src)
+        try:
+            stat = os.stat(path)
+        except (OSError, ValueError):
+            # Probably a URL, those are not cached.
+            return None
+        return ('file', path, stat.st_mtime_ns, stat.st_size)
+
+    def getImage(self):
+        src = self.element.attrib['src']
+        key = self.getImageKey(src)
+        image = imagecache.cache.get(key) if key is not None else None
+        if image is None:
+            data, mediatype = self.loadImage(src)
+            image = imagecache.ImageAsset(
+                data, mediatype, hashlib.sha1(data).hexdigest())
+            if key is not None:
+                imagecache.cache.add(key, image)
+        return image
+
+    def loadImage(self, src):
+        if ',' in src:
+            # Embedded image, a data URI
+            metaData, imageString = src.split(',', 1)
+            if metaData.endswith(';base64'):
+                data = base64.b64decode(imageString)
+            else:
+                data = urllib.parse.unquote_to_bytes(imageString)
+            mediatype = metaData.split(':', 1)[-1].split(';')[0]
+            if not mediatype.startswith('image/'):
+                mediatype = getImageMediaType(data)
         else:
             # File image
-            filename, ext = os.path.splitext(binary)
-            rawdata = attrs['filename'].getvalue()
-            imageString = base64.b64encode(rawdata).decode()
+            data = dict(self.getAttributeValues(select=('src',)))[
+                'src'].getvalue()
+            mediatype = getImageMediaType(data, src)
+        return data, mediatype
 
-        self.addBase64Image(manager, attrs, 'ImageFrame', imageString)
-
-    def addBase64Image(self, manager, attrs, styleName, b64Image):
+    def addImage(self, manager, attrs, styleName, data, mediatype,
+                 digest=None):
         self.align = attrs.get('align', 'left')
         self.frameName = manager.getNextStyleName(styleName)
         self.frameWidth = attrs.get('width')
         self.frameHeight = attrs.get('height')
-        self.binaryImage = odf.office.BinaryData()
-        self.binaryImage.addText(b64Image)
-
+        # The image data is stored in the package, once per document.
         self.image = odf.draw.Image(
+            href=manager.addPicture(data, mediatype, digest),
             type='simple',
             show='embed',
             actuate='onLoad')
-        self.image.appendChild(self.binaryImage)
 
         if self.parent.element.tag != 'td':
             self.inputImageIntoDoc()
@@ -118,27 +182,16 @@ class Image(Flowable):
 
     def inputImageIntoCell(self):
         manager = attr.getManager(self)
-        paraStyleName = manager.getNextStyleName('ImagePara')
-        paraStyle = odf.style.Style(
-            family='paragraph',
-            name=paraStyleName,
-            parentstylename="Standard"
-            )
         paraProps = odf.style.ParagraphProperties(
             textalign=self.align,
             justifysingleword='false'
             )
-        paraStyle.appendChild(paraProps)
-        manager.document.automaticstyles.addElement(paraStyle)
+        paraStyleName = manager.internStyleElement(
+            'ImagePara', odf.style.Style, paraProps,
+            family='paragraph', parentstylename='Standard')
         para = odf.text.P(stylename=paraStyleName)
 
         firstFrameID = manager.getNextStyleName('Frame')
-        firstFrameStyleName = manager.getNextStyleName('FrameStyle')
-        firstFrameStyle = odf.style.Style(
-            family="graphic",
-            name=firstFrameStyleName,
-            parentstylename="Frame"
-            )
         graphicsProperties = odf.style.GraphicProperties(
             border="0.06pt",
             padding="0in",
@@ -146,13 +199,14 @@ class Image(Flowable):
             verticalpos="top",
             verticalrel="baseline"
             )
-        firstFrameStyle.appendChild(graphicsProperties)
-        manager.document.automaticstyles.addElement(firstFrameStyle)
+        firstFrameStyleName = manager.internStyleElement(
+            'FrameStyle', odf.style.Style, graphicsProperties,
+            family='graphic', parentstylename='Frame')
 
         args = {
             'name': firstFrameID,
             'anchortype': 'as-char',
-            'stylename': firstFrameStyle,
+            'stylename': firstFrameStyleName,
             'zindex': '0'
         }
         if self.frameWidth is not None:
@@ -182,22 +236,63 @@ class Image(Flowable):
         self.contents.addElement(para)
 
 
+@functools.lru_cache(maxsize=256)
+def renderQRCode(value, error='H', scale=5):
+    """Render a QR code as PNG image, ``scale`` pixels per module.
+
+    The same codes are used again and again, so they are only rendered
+    once per process. Returns an ``imagecache.ImageAsset``.
+    """
+    png = io.BytesIO()
+    pyqrcode.create(value, error=error).png(png, scale=scale)
+    data = png.getvalue()
+    return imagecache.ImageAsset(
+        data, 'image/png', hashlib.sha1(data).hexdigest())
+
+
+class IBarCodeFlowable(rml_flowable.IBarCodeFlowable):
+    """A barcode flowable, QR codes optionally with minimal images."""
+
+    minimalScale = attr.Boolean(
+        title='Minimal Scale',
+        description=('Render QR codes with one pixel per module, much '
+                     'smaller images, and let the frame scale them to the '
+                     'size they would have.'),
+        required=False)
+
+
 class BarCodeFlowable(Image):
-    signature = rml_flowable.IBarCodeFlowable
+    signature = IBarCodeFlowable
     klass = staticmethod(reportlab.graphics.barcode.createBarcodeDrawing)
     attrMapping = {'code': 'codeName'}
 
+    # The size of QR code modules in pixels.
+    qrScale = 5
+    # The default of the ``minimalScale`` attribute.
+    qrMinimalScale = False
+
     def process(self):
         attrs = dict(self.getAttributeValues(attrMapping=self.attrMapping))
         codeName = attrs.get('codeName')
 
         if codeName == 'QR':
             url = attrs.get('value', 'https://www.shoobx.com')
-            qrCode = pyqrcode.create(url)
-            qrB64 = qrCode.png_as_base64_str(scale=5)
+            level = attrs.get('barLevel', 'H')
+            if attrs.pop('minimalScale', self.qrMinimalScale):
+                image = renderQRCode(url, level, 1)
+                # The PNG width in pixels, from the IHDR chunk.
+                pixels = struct.unpack('>I', image.data[16:20])[0]
+                # LibreOffice shows images without resolution at 96 DPI.
+                size = attrs.get('width') or attrs.get('height') or \
+                    pixels * self.qrScale * 72.0 / 96
+                attrs.setdefault('width', size)
+                attrs.setdefault('height', size)
+            else:
+                image = renderQRCode(url, level, self.qrScale)
             manager = attr.getManager(self)
 
-            self.addBase64Image(manager, attrs, 'BarcodeFrame', qrB64)
+            self.addImage(manager, attrs, 'BarcodeFrame', image.data,
+                          image.mediatype, image.digest)
 
 
 class Spacer(Flowable):
@@ -208,13 +303,11 @@ class Spacer(Flowable):
     def process(self):
         attrs = dict(self.getAttributeValues(attrMapping=self.attrMapping))
         manager = attr.getManager(self)
-        spacerStyleName = manager.getNextStyleName('Sp')
-        spacer = odf.style.Style(name=spacerStyleName, family='paragraph')
         prop = odf.style.ParagraphProperties()
         length = attrs['height']
         prop.setAttribute("linespacing", '%spt' % (length/2.0))
-        spacer.addElement(prop)
-        manager.document.automaticstyles.addElement(spacer)
+        spacerStyleName = manager.internStyleElement(
+            'Sp', odf.style.Style, prop, family='paragraph')
         self.odtParagraph = odf.text.P()
         self.odtParagraph.setAttribute('stylename', spacerStyleName)
         self.contents.addElement(self.odtParagraph)
@@ -606,39 +699,54 @@ class Paragraph(Flowable):
                 span.setAttribute('stylename', styleName)
                 return span
 
+        textProps = self.getTextProperties()
+        if not textProps:
+            # unformatted text does not need a style of its own
+            return span
+
         manager = attr.getManager(self)
-        styleName = manager.getNextStyleName('T')
-        style = odf.style.Style(name=styleName, family='text')
-        manager.document.styles.addElement(style)
+        styleName = manager.internStyle(
+            'T', textProps,
+            lambda name: self._createTextStyle(manager, name, textProps),
+            container=manager.document.styles)
         span.setAttribute('stylename', styleName)
-        textProps = odf.style.TextProperties()
-        style.addElement(textProps)
+        return span
+
+    def getTextProperties(self):
+        # The current inline formatting as ODF text properties. Spans with
+        # equal properties share a single text style.
+        props = []
         if self.italic:
-            textProps.setAttribute('fontstyle', 'italic')
+            props.append(('fontstyle', 'italic'))
         if self.bold:
-            textProps.setAttribute('fontweight', 'bold')
+            props.append(('fontweight', 'bold'))
         if self.underline:
-            textProps.setAttribute('textunderlinetype', 'single')
+            props.append(('textunderlinetype', 'single'))
         if self.fontName:
-            # Make a font declaration, if necessary
-            odf_font_name = stylesheet.rmlFont2odfFont(self.fontName)
-            manager.document.fontfacedecls.addElement(
-                odf.style.FontFace(
-                    name=odf_font_name,
-                    fontfamily=odf_font_name))
-            textProps.setAttribute('fontname', odf_font_name)
+            props.append(('fontname', self.fontName))
         if self.fontSize:
-            textProps.setAttribute('fontsize', self.fontSize)
+            props.append(('fontsize', self.fontSize))
         if self.strike:
-            textProps.setAttribute('textlinethroughstyle', 'solid')
-            textProps.setAttribute('textlinethroughtype', 'single')
+            props.append(('textlinethroughstyle', 'solid'))
+            props.append(('textlinethroughtype', 'single'))
         if self.fontColor is not None:
-            textProps.setAttribute('color', '#'+self.fontColor.hexval()[2:])
+            props.append(('color', '#'+self.fontColor.hexval()[2:]))
         if self.superscript is not None:
-            textProps.setAttribute('textposition', 'super 58%')
+            props.append(('textposition', 'super 58%'))
         if self.subscript is not None:
-            textProps.setAttribute('textposition', 'sub 58%')
-        return span
+            props.append(('textposition', 'sub 58%'))
+        return tuple(props)
+
+    def _createTextStyle(self, manager, styleName, textProps):
+        style = odf.style.Style(name=styleName, family='text')
+        props = odf.style.TextProperties()
+        style.addElement(props)
+        for name, value in textProps:
+            if name == 'fontname':
+                # Make a font declaration, if necessary
+                value = manager.addFontFace(value)
+            props.setAttribute(name, value)
+        return style
 
     def determineStyle(self):
         if 'style' not in self.element.attrib:
@@ -770,16 +878,12 @@ class NextPage(Flowable):
 
     def process(self):
         manager = attr.getManager(self)
-        pageBreakStyleName = manager.getNextStyleName("PageBreak")
-        pageBreakStyle = odf.style.Style(
-            name=pageBreakStyleName,
-            family='paragraph',
-            parentstylename='Footer')
         prop = odf.style.ParagraphProperties()
         # need to set breakafter here, breakbefore is a pain with ODF
         prop.setAttribute('breakafter', 'page')
-        pageBreakStyle.addElement(prop)
-        manager.document.automaticstyles.addElement(pageBreakStyle)
+        pageBreakStyleName = manager.internStyleElement(
+            'PageBreak', odf.style.Style, prop,
+            family='paragraph', parentstylename='Footer')
         self.para = odf.text.P(stylename=pageBreakStyleName)
         self.contents.addElement(self.para)
 
@@ -0,0 +1,85 @@
+##############################################################################
+#
+# Copyright (c) 2017 Shoobx, Inc.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Process-wide cache of loaded images
+
+Templates use the same few logos over and over again, so the loaded image
+data is kept across conversions. File images are keyed by their path,
+modification time and size, so changed files are loaded again; data URIs
+by the hash of the URI.
+"""
+import collections
+import threading
+
+ImageAsset = collections.namedtuple(
+    'ImageAsset', ['data', 'mediatype', 'digest'])
+
+CacheInfo = collections.namedtuple(
+    'CacheInfo', ['hits', 'misses', 'maxsize', 'currsize', 'entries'])
+
+# The default size limit of the cache in bytes of image data.
+MAXSIZE = 64 * 1024 * 1024
+
+
+class ImageCache(object):
+    """A least recently used cache of ``ImageAsset``s.
+
+    The size is limited by the total size of the image data, not by the
+    number of entries. Images bigger than the limit are not cached at all.
+    """
+
+    def __init__(self, maxsize=MAXSIZE):
+        self.maxsize = maxsize
+        self.currsize = 0
+        self.hits = 0
+        self.misses = 0
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            asset = self.entries.get(key)
+            if asset is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            return asset
+
+    def add(self, key, asset):
+        size = len(asset.data)
+        if size > self.maxsize:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.currsize -= len(old.data)
+            self.entries[key] = asset
+            self.currsize += size
+            while self.currsize > self.maxsize:
+                key, old = self.entries.popitem(last=False)
+                self.currsize -= len(old.data)
+
+    def info(self):
+        with self.lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize,
+                             self.currsize, len(self.entries))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.currsize = 0
+            self.hits = self.misses = 0
+
+
+cache = ImageCache()
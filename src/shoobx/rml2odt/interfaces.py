@@ -19,14 +19,75 @@ import zope.interface
 class IRML2ODT(zope.interface.Interface):
     """This is the main public API of shoobx.rml2odt"""
 
-    def convertString(rml, remove_encoding=True, filename=None):
+    def convertString(rml, remove_encoding=True, filename=None, format=None,
+                      stats=False, rowSources=None, serializer=None,
+                      shareListStyles=None):
         """Parse an RML string and convert it to ODT.
 
-        The output is a ``StringIO`` object.
+        The output is a ``StringIO`` object. ``format`` is ``odt`` or
+        ``fodt`` for flat XML, by default ``Document.format``.
+
+        With ``stats`` the output is returned together with the
+        ``document.ConversionStats`` of the conversion, as a tuple.
+
+        ``rowSources`` maps names to the rows of ``<bulkData
+        source="name"/>`` tags, iterables of rows or ``table.RowSource``
+        objects. The rows are added to the table as they are iterated.
+
+        ``serializer`` is the XML serializer writing the package, one of
+        ``writer.SERIALIZERS``, by default ``Document.serializer``.
+
+        ``shareListStyles`` set to False gives every list its own list
+        style, by default ``Document.shareListStyles``. Converting to DOCX
+        continues the numbering of lists sharing a style.
         """
 
-    def convertFile(inputfile, outputfile):
+    def convertToBytes(rml, remove_encoding=True, filename=None,
+                       format=None, stats=False, rowSources=None,
+                       serializer=None, shareListStyles=None):
+        """Parse an RML string and convert it to ODT.
+
+        The output is the ODT data as ``bytes``, like ``convertString``
+        paired with the ``ConversionStats`` if ``stats`` is true.
+        """
+
+    def convertToStream(rml, outputfile, remove_encoding=True, filename=None,
+                        format=None, stats=False, rowSources=None,
+                        serializer=None, shareListStyles=None):
+        """Parse an RML string and write the ODT to a file-like object.
+
+        Only the ``write()`` method of ``outputfile`` is used, so it does
+        not have to be seekable; pipes and sockets work as well. Returns
+        the ``ConversionStats`` if ``stats`` is true.
+        """
+
+    def convertFile(inputfile, outputfile, format=None, stats=False,
+                    rowSources=None, serializer=None, shareListStyles=None):
         """Convert an RML file to an ODT file.
+
+        Without ``format`` a ``.fodt`` output file gets flat XML. Returns
+        the ``ConversionStats`` if ``stats`` is true.
+        """
+
+    def convertMany(inputs, processes=None, maxtasksperchild=None,
+                    ordered=True, chunksize=1, format=None, serializer=None,
+                    shareListStyles=None):
+        """Convert many RML documents using a pool of worker processes.
+
+        ``inputs`` is an iterable of RML strings or bytes, paths to RML
+        files, or ``(inputfile, outputfile)`` pairs, which are converted
+        with ``convertFile``. ``format``, ``serializer`` and
+        ``shareListStyles`` are passed to every conversion.
+
+        ``processes`` defaults to the number of CPUs; with ``1`` everything
+        is converted in the current process. Workers are replaced after
+        ``maxtasksperchild`` conversions if given.
+
+        Yields a ``ConversionResult`` with the ``index`` of the input, the
+        ``output`` (ODT bytes, or the output file name for pairs) and the
+        ``error`` raised by a failed conversion. Results come in the order
+        of ``inputs`` unless ``ordered`` is false, in which case they are
+        yielded as soon as they are done.
         """
 
 
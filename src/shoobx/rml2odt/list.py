@@ -29,6 +29,17 @@ from shoobx.rml2odt import flowable, stylesheet
 from shoobx.rml2odt.interfaces import IContentContainer
 
 
+def getListNesting(directive):
+    """Return the number of lists ``directive`` is nested in."""
+    nesting = 0
+    parent = directive.parent
+    while parent is not None:
+        if isinstance(parent, ListBase):
+            nesting += 1
+        parent = parent.parent
+    return nesting
+
+
 @zope.interface.implementer(IContentContainer)
 class ListItem(flowable.Flow):
     signature = rml_flowable.IParagraph
@@ -205,18 +216,23 @@ class BlockTableInList(directive.RMLDirective):
             break  # done
 
         manager = attr.getManager(self)
-        newstylename = manager.getNextStyleName('ListTable')
         style_attrs = {'start': ' ', 'bulletDedent': indent}
-        stylesheet.registerListStyle(manager.document, newstylename,
-                                     None, style_attrs)
+        if manager.shareListStyles:
+            listStyleName = stylesheet.internListStyle(
+                manager, None, style_attrs, 'ul', getListNesting(self) + 1)
+        else:
+            newstylename = manager.getNextStyleName('ListTable')
+            stylesheet.registerListStyle(manager, newstylename,
+                                         None, style_attrs)
+            listStyleName = newstylename + '-ul'
 
         # need to add a Paragraph, otherwise the bullet does NOT show up
         # will place the table on the next line, but what else to do?
         newPara = odf.text.P()
-        self.parent.contents.appendChild(newPara)
+        self.parent.contents.addElement(newPara)
 
-        ol = odf.text.List(stylename=newstylename + '-ul')
-        self.parent.contents.appendChild(ol)
+        # The list is built detached and added to the document as a whole.
+        ol = odf.text.List(stylename=listStyleName)
 
         # Retrieve the data
         for row in self.element.getchildren():
@@ -235,6 +251,7 @@ class BlockTableInList(directive.RMLDirective):
                 if idx < count - 1:
                     # skip the tab after the last cell
                     p.addElement(odf.text.Tab())
+        self.parent.contents.addElement(ol)
 
 
 class OrderedListItem(ListItem):
@@ -270,10 +287,39 @@ class ListBase(flowable.Flowable):
             else:
                 break
 
-        manager = attr.getManager(self)
-        for style in manager.document.automaticstyles.childNodes:
-            if style.getAttribute('name') == root.stylename:
-                return style
+        return attr.getManager(self).getStyle(root.stylename)
+
+    def getPrivateRootStyle(self):
+        """Return the root style, to be modified by this list.
+
+        A shared style is copied first and the root list switched to the
+        copy, so the other lists using the style are not affected.
+        """
+        style = self.getRootStyle()
+        if getattr(style, 'shared', False):
+            manager = attr.getManager(self)
+            style = stylesheet.cloneNode(style)
+            style.shared = False
+            style.setAttribute('name', manager.getNextStyleName('List'))
+            manager.addStyle(style)
+            self.rootList.stylename = style.getAttribute('name')
+            self.rootList.item.setAttribute(
+                'stylename', self.rootList.stylename)
+        return style
+
+    def getDepth(self):
+        """The deepest ODF list level used by this list.
+
+        Lists of the same type nested in this one use its style, and lists
+        nested in other lists start below the levels of those.
+        """
+        def getDepth(element):
+            return 1 + max(
+                (getDepth(sub)
+                 for item in element.iterchildren('li')
+                 for sub in item.iterchildren(element.tag)),
+                default=0)
+        return min(getListNesting(self) + getDepth(self.element), 10)
 
     def process(self):
         # Keeps track of the root list (in the case of nested lists)
@@ -303,16 +349,20 @@ class ListBase(flowable.Flowable):
         attrs = dict(self.getAttributeValues(
             select=self.styleAttributes, attrMapping=self.attrMapping))
 
-        # Always make a special style for each root level list, or numbering
-        # is messed up when you convert to docx.
+        # Root level lists with the same attributes share one list style.
+        # Converting to DOCX continues the numbering of lists sharing a
+        # style, pass ``shareListStyles=False`` to the convert functions (or
+        # ``--no-share-list-styles``) to register a style for each list.
         if self.level == 1:
-            # Register style
-            stylesheet.registerListStyle(manager.document, newstylename,
-                                         newstyle, attrs)
-            if isinstance(self, OrderedList):
-                newstylename = newstylename + '-ol'
+            ulol = 'ol' if isinstance(self, OrderedList) else 'ul'
+            if manager.shareListStyles:
+                newstylename = stylesheet.internListStyle(
+                    manager, newstyle, attrs, ulol, self.getDepth())
             else:
-                newstylename = newstylename + '-ul'
+                # Register style
+                stylesheet.registerListStyle(manager, newstylename,
+                                             newstyle, attrs)
+                newstylename = f'{newstylename}-{ulol}'
             self.stylename = newstylename
 
             self.item = odf.text.List(stylename=newstylename)
@@ -340,7 +390,7 @@ class ListBase(flowable.Flowable):
                 # level
                 # XXX: might need to join with the code of
                 #      stylesheet.registerListStyle
-                style = self.getRootStyle()
+                style = self.getPrivateRootStyle()
                 for levelstyle in style.childNodes:
                     if int(levelstyle.getAttribute('level')) != self.level:
                         # Not this level
@@ -0,0 +1,118 @@
+##############################################################################
+#
+# Copyright (c) 2017 Shoobx, Inc.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Per directive profiling
+
+Set ``Document.profile`` to record how long the directives of every tag
+took to process and how many ODF elements they added to the document.
+After the conversion ``Document.profiler`` holds the results.
+"""
+import time
+
+from z3c.rml import attr
+
+
+class TagStats(object):
+    """The aggregated processing of one tag.
+
+    ``inclusive`` is the time spent in the directives of the tag including
+    their sub-directives, ``exclusive`` without them; both in seconds.
+    Recursive tags count towards ``inclusive`` only once. ``nodes`` is the
+    number of ODF elements added to the document, excluding the ones
+    added by sub-directives.
+    """
+
+    __slots__ = ('tag', 'calls', 'inclusive', 'exclusive', 'nodes')
+
+    def __init__(self, tag):
+        self.tag = tag
+        self.calls = 0
+        self.inclusive = 0.0
+        self.exclusive = 0.0
+        self.nodes = 0
+
+    def __repr__(self):
+        return '<TagStats %s calls=%d inclusive=%.6f exclusive=%.6f ' \
+               'nodes=%d>' % (self.tag, self.calls, self.inclusive,
+                              self.exclusive, self.nodes)
+
+
+class DirectiveProfiler(object):
+    """Record the processing of directives per tag."""
+
+    def __init__(self, odf):
+        self.odf = odf
+        self.stats = {}
+        # The time and elements of the sub-directives of the directives
+        # being processed, innermost last.
+        self.stack = []
+        self.active = {}
+
+    def countNodes(self):
+        # odfpy registers the elements added to the document with
+        # addElement here, including their descendants; nodes attached
+        # with appendChild are not counted.
+        return sum(map(len, self.odf.element_dict.values()))
+
+    def process(self, handler, tag):
+        """Process ``handler``, the directive of ``tag``."""
+        stats = self.stats.get(tag)
+        if stats is None:
+            stats = self.stats[tag] = TagStats(tag)
+        active = self.active.get(tag, 0)
+        self.active[tag] = active + 1
+        self.stack.append([0.0, 0])
+        nodes = self.countNodes()
+        start = time.perf_counter()
+        try:
+            handler.process()
+        finally:
+            elapsed = time.perf_counter() - start
+            created = self.countNodes() - nodes
+            childTime, childNodes = self.stack.pop()
+            self.active[tag] = active
+            stats.calls += 1
+            if not active:
+                stats.inclusive += elapsed
+            stats.exclusive += elapsed - childTime
+            stats.nodes += created - childNodes
+            if self.stack:
+                self.stack[-1][0] += elapsed
+                self.stack[-1][1] += created
+
+    def report(self, limit=None):
+        """A table of the tag statistics, the slowest tags first."""
+        stats = sorted(self.stats.values(),
+                       key=lambda stats: stats.exclusive, reverse=True)
+        lines = ['{:<24} {:>8} {:>12} {:>12} {:>8}'.format(
+            'tag', 'calls', 'inclusive', 'exclusive', 'nodes')]
+        for stats in stats[:limit]:
+            lines.append('{:<24} {:>8} {:>10.2f}ms {:>10.2f}ms {:>8}'.format(
+                stats.tag, stats.calls, stats.inclusive * 1000,
+                stats.exclusive * 1000, stats.nodes))
+        return '\n'.join(lines)
+
+
+def getProfiler(directive):
+    """The profiler of the document of ``directive``, if profiling."""
+    # Directives processed by ``directive.processDirective`` know the
+    # profiler of their parent, so the document is only looked up once.
+    try:
+        return directive.profiler
+    except AttributeError:
+        pass
+    try:
+        manager = attr.getManager(directive)
+    except ValueError:
+        return None
+    return getattr(manager, 'profiler', None)
@@ -13,17 +13,27 @@
 ##############################################################################
 """RML to ODT Converter"""
 import argparse
+import collections
+import functools
+import glob
 import io
+import json
+import multiprocessing
+import os
+import pickle
+import sys
+import time
 
 import lxml.etree
 import zope.interface
 
-from shoobx.rml2odt import document, interfaces
+from shoobx.rml2odt import document, interfaces, writer
 
 zope.interface.moduleProvides(interfaces.IRML2ODT)
 
 
-def convertString(rml, remove_encoding=True, filename=None):
+def _parseString(rml, remove_encoding=True, filename=None, format=None,
+                 rowSources=None, serializer=None, shareListStyles=None):
     if isinstance(rml, str) and remove_encoding:
         # RML is a unicode string, but oftentimes documents declare their
         # encoding using <?xml ...>. Unfortuantely, I cannot tell lxml to
@@ -32,38 +42,315 @@ def convertString(rml, remove_encoding=True, filename=None):
             rml = rml.split('\n', 1)[-1]
     root = lxml.etree.fromstring(rml)
     doc = document.Document(root)
+    if format:
+        doc.format = format
+    if serializer:
+        doc.serializer = serializer
     if filename:
         doc.filename = filename
-    output = io.BytesIO()
-    doc.process(output)
-    output.seek(0)
-    return output
+    if rowSources:
+        doc.rowSources = rowSources
+    if shareListStyles is not None:
+        doc.shareListStyles = shareListStyles
+    return doc
 
 
-def convertFile(inputfile, outputfile):
+class _ChunkList(list):
+    # Collects the chunks of the package, so they are joined only once.
+    write = list.append
+
+
+def convertToStream(rml, outputfile, remove_encoding=True, filename=None,
+                    format=None, stats=False, rowSources=None,
+                    serializer=None, shareListStyles=None):
+    doc = _parseString(
+        rml, remove_encoding, filename, format, rowSources, serializer,
+        shareListStyles)
+    doc.process(outputfile)
+    if stats:
+        return doc.getStats()
+
+
+def convertToBytes(rml, remove_encoding=True, filename=None, format=None,
+                   stats=False, rowSources=None, serializer=None,
+                   shareListStyles=None):
+    output = _ChunkList()
+    result = convertToStream(
+        rml, output, remove_encoding, filename, format, stats, rowSources,
+        serializer, shareListStyles)
+    if stats:
+        return b''.join(output), result
+    return b''.join(output)
+
+
+def convertString(rml, remove_encoding=True, filename=None, format=None,
+                  stats=False, rowSources=None, serializer=None,
+                  shareListStyles=None):
+    result = convertToBytes(
+        rml, remove_encoding, filename, format, stats, rowSources,
+        serializer, shareListStyles)
+    # BytesIO shares the buffer of the bytes it is initialized with.
+    if stats:
+        return io.BytesIO(result[0]), result[1]
+    return io.BytesIO(result)
+
+
+def getFormat(filename, default='odt'):
+    """The output format matching the extension of ``filename``."""
+    extension = os.path.splitext(filename)[1][1:].lower()
+    return extension if extension in writer.FORMATS else default
+
+
+def convertFile(inputfile, outputfile, format=None, stats=False,
+                rowSources=None, serializer=None, shareListStyles=None):
     with open(inputfile, 'rb') as rmlinput:
         root = lxml.etree.parse(rmlinput).getroot()
         doc = document.Document(root)
         doc.filename = inputfile
+        doc.format = format or getFormat(outputfile, doc.format)
+        if rowSources:
+            doc.rowSources = rowSources
+        if serializer:
+            doc.serializer = serializer
+        if shareListStyles is not None:
+            doc.shareListStyles = shareListStyles
 
     with open(outputfile, 'wb') as odtoutput:
         # Create a Reportlab canvas by processing the document
         doc.process(odtoutput)
+    if stats:
+        return doc.getStats()
+
+
+ConversionResult = collections.namedtuple(
+    'ConversionResult', ['index', 'output', 'error'])
+
+
+def _initWorker():
+    # Build the per-process caches up front instead of in the first task.
+    document.getDefaultStyles()
+
+
+def _convertItem(task, format=None, serializer=None, shareListStyles=None):
+    index, item = task
+    try:
+        if isinstance(item, tuple):
+            inputfile, outputfile = item
+            convertFile(inputfile, outputfile, format=format,
+                        serializer=serializer,
+                        shareListStyles=shareListStyles)
+            output = outputfile
+        elif isinstance(item, bytes) or (
+                isinstance(item, str) and item.lstrip().startswith('<')):
+            output = convertToBytes(
+                item, format=format, serializer=serializer,
+                shareListStyles=shareListStyles)
+        else:
+            with open(item, 'rb') as rmlinput:
+                output = convertToBytes(
+                    rmlinput.read(), filename=os.fspath(item),
+                    format=format, serializer=serializer,
+                    shareListStyles=shareListStyles)
+    except Exception as err:
+        try:
+            pickle.dumps(err)
+        except Exception:
+            # The error has to travel back from the worker process.
+            err = RuntimeError('{}: {}'.format(err.__class__.__name__, err))
+        return ConversionResult(index, None, err)
+    return ConversionResult(index, output, None)
+
+
+def convertMany(inputs, processes=None, maxtasksperchild=None,
+                ordered=True, chunksize=1, format=None, serializer=None,
+                shareListStyles=None):
+    tasks = enumerate(inputs)
+    convertItem = functools.partial(
+        _convertItem, format=format, serializer=serializer,
+        shareListStyles=shareListStyles)
+    if processes == 1:
+        # No need for a pool, which also makes debugging much easier.
+        _initWorker()
+        for task in tasks:
+            yield convertItem(task)
+        return
+
+    with multiprocessing.Pool(processes, initializer=_initWorker,
+                              maxtasksperchild=maxtasksperchild) as pool:
+        if ordered:
+            results = pool.imap(convertItem, tasks, chunksize)
+        else:
+            results = pool.imap_unordered(convertItem, tasks, chunksize)
+        yield from results
+
+
+def _expandInputs(names):
+    # Turn the command line inputs into (inputfile, outputfile) pairs,
+    # outputfile being None if not given explicitly.
+    for name in names:
+        if name == '-':
+            yield name, None
+        elif name.endswith('.jsonl'):
+            # JSON-lines manifest, one {"input": ..., "output": ...} per line
+            with open(name) as manifest:
+                for line in manifest:
+                    if line.strip():
+                        entry = json.loads(line)
+                        yield entry['input'], entry.get('output')
+        elif os.path.isdir(name):
+            pattern = os.path.join(name, '**', '*.rml')
+            for path in sorted(glob.glob(pattern, recursive=True)):
+                yield path, None
+        elif _isGlob(name):
+            for path in sorted(glob.glob(name, recursive=True)):
+                yield path, None
+        else:
+            yield name, None
+
+
+def _isGlob(name):
+    return any(char in name for char in '*?[')
+
+
+def _isInputName(name):
+    # Whether ``name`` names an input, see _expandInputs.
+    return (name == '-' or name.endswith('.jsonl') or _isGlob(name)
+            or os.path.exists(name) or name.lower().endswith('.rml'))
+
+
+def _isOutputName(name):
+    # Whether ``name`` is the output of "rml2odt input.rml output.odt", an
+    # existing output file is overwritten.
+    extension = os.path.splitext(name)[1][1:].lower()
+    return (extension in writer.FORMATS and not _isGlob(name)
+            and not os.path.isdir(name))
+
+
+def _getOutputName(inputfile, outputdir, format):
+    name = '{}.{}'.format(
+        os.path.splitext(os.path.basename(inputfile))[0], format)
+    if outputdir is None:
+        outputdir = os.path.dirname(inputfile)
+    return os.path.join(outputdir, name)
+
+
+def _convertStream(inputfile, outputfile, format=None, serializer=None,
+                   shareListStyles=None):
+    if inputfile == '-':
+        rml = sys.stdin.buffer.read()
+        filename = '<stdin>'
+    else:
+        with open(inputfile, 'rb') as rmlinput:
+            rml = rmlinput.read()
+        filename = inputfile
+    if outputfile == '-':
+        convertToStream(rml, sys.stdout.buffer, filename=filename,
+                        format=format, serializer=serializer,
+                        shareListStyles=shareListStyles)
+    else:
+        with open(outputfile, 'wb') as odtoutput:
+            convertToStream(rml, odtoutput, filename=filename,
+                            format=format, serializer=serializer,
+                            shareListStyles=shareListStyles)
 
 
 def main(args=None):
-    if args is None:
-        parser = argparse.ArgumentParser(
-            prog='rml2pdf',
-            description='Converts file in RML format into ODT file.',
-            epilog='Copyright (c) 2017 Shoobx, Inc.'
-        )
-        parser.add_argument(
-            'inputfile',
-            help='RML file to be processed')
-        parser.add_argument(
-            'outputfile', nargs='?',
-            help='Output ODT file name')
-        pargs = parser.parse_args()
-
-    convertFile(pargs.inputfile, pargs.outputfile)
+    parser = argparse.ArgumentParser(
+        prog='rml2odt',
+        description='Converts files in RML format into ODT files.',
+        epilog='Copyright (c) 2017 Shoobx, Inc.'
+    )
+    parser.add_argument(
+        'inputs', nargs='+', metavar='input',
+        help='RML file, glob pattern, directory of RML files, JSON-lines '
+             'manifest (*.jsonl) or - for stdin. The classic form '
+             '"rml2odt input.rml output.odt" is still supported.')
+    parser.add_argument(
+        '-o', '--output', dest='output',
+        help='Output ODT file name, or - for stdout (single input only)')
+    parser.add_argument(
+        '-d', '--output-dir', dest='outputdir',
+        help='Directory for the output files, by default they are written '
+             'next to the input files')
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=1,
+        help='Number of parallel conversion processes, 0 for one per CPU')
+    parser.add_argument(
+        '-f', '--format', choices=sorted(writer.FORMATS),
+        help='Output format: zipped ODT or flat XML (FODT). By default it '
+             'is taken from the --output extension, or ODT')
+    parser.add_argument(
+        '--serializer', choices=sorted(writer.SERIALIZERS),
+        default=document.Document.serializer,
+        help='XML serializer used to write the ODT files')
+    parser.add_argument(
+        '--no-share-list-styles', dest='shareListStyles',
+        action='store_false', default=None,
+        help='Give every list its own list style instead of sharing it '
+             'between lists with the same attributes. Converting to DOCX '
+             'continues the numbering of lists sharing a style')
+    parser.add_argument(
+        '-q', '--quiet', action='store_true',
+        help='Do not print the summary')
+    pargs = parser.parse_args(args)
+
+    names = pargs.inputs
+    output = pargs.output
+    if (output is None and pargs.outputdir is None and len(names) == 2
+            and names[0] != '-'):
+        if _isOutputName(names[1]):
+            # rml2odt input.rml output.odt
+            names, output = names[:1], names[1]
+        elif not _isInputName(names[1]):
+            parser.error('{} is not an input, use -o to name the output '
+                         'file'.format(names[1]))
+    format = pargs.format or getFormat(output or '')
+
+    tasks = []
+    for inputfile, outputfile in _expandInputs(names):
+        if outputfile is None:
+            if output is not None:
+                outputfile = output
+            elif inputfile == '-':
+                outputfile = '-'
+            else:
+                outputfile = _getOutputName(
+                    inputfile, pargs.outputdir, format)
+        tasks.append((inputfile, outputfile))
+
+    if output is not None and len(tasks) > 1:
+        parser.error('--output can only be used with a single input')
+    if pargs.outputdir is not None:
+        os.makedirs(pargs.outputdir, exist_ok=True)
+
+    start = time.time()
+    failures = []
+    if any('-' in task for task in tasks):
+        if len(tasks) > 1:
+            parser.error('stdin/stdout can only be used with a single input')
+        try:
+            _convertStream(*tasks[0], format=format,
+                           serializer=pargs.serializer,
+                           shareListStyles=pargs.shareListStyles)
+        except Exception as err:
+            failures.append((tasks[0][0], err))
+    else:
+        processes = pargs.jobs or None
+        for result in convertMany(tasks, processes=processes, ordered=False,
+                                  format=format, serializer=pargs.serializer,
+                                  shareListStyles=pargs.shareListStyles):
+            if result.error is not None:
+                failures.append((tasks[result.index][0], result.error))
+    elapsed = time.time() - start
+
+    if not pargs.quiet:
+        for inputfile, error in failures:
+            print('{}: {}'.format(inputfile, error), file=sys.stderr)
+        if len(tasks) > 1 or failures:
+            print('Converted {} of {} documents in {:.2f}s '
+                  '({:.1f} documents/s), {} failed.'.format(
+                      len(tasks) - len(failures), len(tasks), elapsed,
+                      len(tasks) / elapsed if elapsed else 0,
+                      len(failures)),
+                  file=sys.stderr)
+    return 1 if failures else 0
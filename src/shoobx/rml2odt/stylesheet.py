@@ -14,9 +14,11 @@
 """Style Related Element Processing
 """
 import copy
-from collections import defaultdict
+import functools
+from collections import defaultdict, namedtuple
 
 import lazy
+import odf.element
 import odf.style
 import odf.text
 import reportlab.lib.enums
@@ -26,6 +28,8 @@ from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT, TA_RIGHT
 from z3c.rml import SampleStyleSheet, attr, directive, special
 from z3c.rml import stylesheet as rml_stylesheet
 
+from shoobx.rml2odt import directive as odt_directive
+
 RML2ODT_ALIGNMENTS = {
     TA_LEFT: 'left',
     TA_CENTER: 'center',
@@ -38,13 +42,30 @@ def pt(pt):
     return '%spt' % pt
 
 
+def cloneNode(node):
+    """Copy an odfpy node and its children, detached from any document.
+
+    Much cheaper than ``copy.deepcopy``, which also walks the parent and
+    owner document references.
+    """
+    clone = copy.copy(node)
+    clone.parentNode = clone.previousSibling = clone.nextSibling = None
+    if isinstance(node, odf.element.Element):
+        clone.ownerDocument = None
+        clone.attributes = dict(node.attributes)
+        clone.childNodes = []
+        for child in node.childNodes:
+            clone.appendChild(cloneNode(child))
+    return clone
+
+
 def hexColor(color):
     if color is None:
         return color
     return '#%s' % color.hexval()[2:]
 
 
-class Initialize(directive.RMLDirective):
+class Initialize(odt_directive.RMLDirective):
     signature = rml_stylesheet.IInitialize
     factories = {
         'name': special.Name,
@@ -62,18 +83,19 @@ FONT_MAP = {
 }
 
 
+@functools.lru_cache(maxsize=None)
 def rmlFont2odfFont(font):
     # Maps between RML/Postscript font names and ODT/LibreOffice names
     name = font.lower().split('-')[0]
     return FONT_MAP.get(name, font)
 
 
-def registerParagraphStyle(doc, name, rmlStyle):
+def registerParagraphStyle(manager, name, rmlStyle):
     if 'style.' in name:
         name = name[6:]
 
     odtStyle = odf.style.Style(name=name, family='paragraph')
-    doc.automaticstyles.addElement(odtStyle)
+    manager.addStyle(odtStyle)
 
     # Paragraph Properties
     paraProps = odf.style.ParagraphProperties()
@@ -144,11 +166,7 @@ def registerParagraphStyle(doc, name, rmlStyle):
                 textProps.setAttribute('fontweight', 'bold')
                 textProps.setAttribute('fontstyle', 'italic')
 
-        odf_font_name = rmlFont2odfFont(rmlStyle.fontName)
-        doc.fontfacedecls.addElement(
-            odf.style.FontFace(
-                name=odf_font_name,
-                fontfamily=odf_font_name))
+        odf_font_name = manager.addFontFace(rmlStyle.fontName)
         textProps.setAttribute('fontname', odf_font_name)
     textProps.setAttribute('fontsize', rmlStyle.fontSize)
     textProps.setAttribute('texttransform', rmlStyle.textTransform)
@@ -168,10 +186,8 @@ class ParagraphStyle(directive.RMLDirective):
     signature = rml_stylesheet.IParagraphStyle
 
     def adjustAttributeValues(self, style, parentName):
-        try:
-            parentElem = self.parent.parent.document.getStyleByName(
-                str(parentName))
-        except AssertionError:
+        parentElem = attr.getManager(self).getStyle(str(parentName))
+        if parentElem is None:
             # The style doesn't exist in the document
             return style
 
@@ -226,19 +242,16 @@ class ParagraphStyle(directive.RMLDirective):
         name = kwargs.pop('name')
         style = copy.deepcopy(parent)
         style.name = name[6:] if name.startswith('style.') else name
-        document = self.parent.parent.document
+        manager = attr.getManager(self)
         if name == 'Normal':
-            defaultNormalStyle = self.parent.parent.document.getStyleByName(
-                'Normal')
-            self.parent.parent.document.automaticstyles.removeChild(
-                defaultNormalStyle)
+            manager.removeStyle(manager.getStyle('Normal'))
 
         style = self.adjustAttributeValues(style, parent.name)
 
         for attrName, attrValue in kwargs.items():
             setattr(style, attrName, attrValue)
-        registerParagraphStyle(document, name, style)
-        attr.getManager(self).styles[name] = style
+        registerParagraphStyle(manager, name, style)
+        manager.styles[name] = style
 
 
 class SpanStyle(ParagraphStyle):
@@ -248,9 +261,8 @@ class SpanStyle(ParagraphStyle):
         kwargs = dict(self.getAttributeValues())
         name = kwargs.get('name')
         super().process()
-        self.parent.parent.document.getStyleByName(
-            str(name)
-        ).setAttribute('family', 'text')
+        attr.getManager(self).getStyle(str(name)).setAttribute(
+            'family', 'text')
 
 
 
@@ -535,7 +547,7 @@ class LineStyle(TableStyleCommand):
         return result
 
 
-class BlockTableStyle(directive.RMLDirective):
+class BlockTableStyle(odt_directive.RMLDirective):
     signature = rml_stylesheet.IBlockTableStyle
 
     factories = {
@@ -580,31 +592,21 @@ BULLETS = {
 }
 
 
-def registerListStyle(doc, name, rmlStyle, attributes=None, ulol=None):
-    """Registers an rmlStyle as ODF styles
+# The effective attributes of a list style; ``bulletDedent`` is in points.
+ListProperties = namedtuple(
+    'ListProperties', ['start', 'numType', 'bulletFormat', 'bulletDedent',
+                       'bulletFontName'])
 
-    rmlStyles have information both for ordered and unordered lists,
-    ODF styles do not, so we need to register two different, but similar lists.
-    """
-    if ulol is None:
-        # Register both the unordered and ordered lists. odf seem to only
-        # include the ones actually used anyway.
-        registerListStyle(doc, name, rmlStyle, attributes=attributes,
-                          ulol='ul')
-        registerListStyle(doc, name, rmlStyle, attributes=attributes,
-                          ulol='ol')
-        return
 
-    name = f'{name}-{ulol}'
+def getListProperties(rmlStyle, attributes=None):
+    """Return the ``ListProperties`` of ``rmlStyle`` and ``attributes``.
 
+    Values in ``attributes`` override the ones of ``rmlStyle``, which may be
+    None.
+    """
     if attributes is None:
         attributes = {}
     start = attributes.get('start', getattr(rmlStyle, 'start', 1))
-    if isinstance(start, int):
-        bulletType = None
-    else:
-        bulletType = start
-
     numType = attributes.get('bulletType',
                              getattr(rmlStyle, 'bulletType', None))
     bulletFormat = attributes.get('bulletFormat',
@@ -623,25 +625,30 @@ def registerListStyle(doc, name, rmlStyle, attributes=None, ulol=None):
 
         bulletDedent = float(bulletDedent[:-2]) * units[bulletDedent[-2:]]
 
-    odtStyle = odf.text.ListStyle(name=name)
+    return ListProperties(start, numType, bulletFormat, bulletDedent,
+                          getattr(rmlStyle, 'bulletFontName', None))
+
+
+def addListLevels(manager, odtStyle, props, ulol, levels=10):
+    """Add the level styles up to ``levels`` missing in ``odtStyle``."""
+    start, numType, bulletFormat, bulletDedent, bulletFontName = props
+    if isinstance(start, int):
+        bulletType = None
+    else:
+        bulletType = start
+    # ODF doesn't support fancy formats like '1st' or 'First'.
+    fancy = numType and numType.lower() not in '1ai'
 
     # Add the level properties:
-    for level in range(1, 11):
+    for level in range(len(odtStyle.childNodes) + 1, levels + 1):
 
         # Declare properties of the list style
         listProps = odf.style.ListLevelProperties()
         listProps.setAttribute('listlevelpositionandspacemode',
                                'label-alignment')
-        if getattr(rmlStyle, 'bulletFontName', None) is not None:
-            odf_font_name = rmlFont2odfFont(rmlStyle.bulletFontName)
-
-            if odf_font_name not in [x.getAttribute('name')
-                                     for x in doc.fontfacedecls.childNodes]:
-                doc.fontfacedecls.addElement(
-                    odf.style.FontFace(
-                        name=odf_font_name,
-                        fontfamily=odf_font_name))
-                listProps.setAttribute('fontname', odf_font_name)
+        if bulletFontName is not None:
+            odf_font_name = manager.addFontFace(bulletFontName)
+            listProps.setAttribute('fontname', odf_font_name)
 
         level_indent = (18 * (level-1)) + bulletDedent
         label_align = odf.style.ListLevelLabelAlignment(
@@ -660,20 +667,21 @@ def registerListStyle(doc, name, rmlStyle, attributes=None, ulol=None):
             else:
                 pre = post = ''
 
-            if numType and numType.lower() not in '1ai':
-                # ODF doesn't support fancy formats like '1st' or 'First'.
+            numformat = numType
+            if fancy:
                 # Make a number format that is empty.
-                odtStyle.fancy_numbering = numType
-                odtStyle.post = post
-                odtStyle.pre = pre
-                post = pre = ''
-                numType = ''
+                numformat = ''
+                if level == 1:
+                    odtStyle.fancy_numbering = numType
+                    odtStyle.post = post
+                    odtStyle.pre = pre
+                    post = pre = ''
 
             lvl_style = odf.text.ListLevelStyleNumber(
                 level=level,
                 numsuffix=post,
                 numprefix=pre,
-                numformat=numType,
+                numformat=numformat,
                 startvalue=start,
             )
         else:
@@ -701,15 +709,56 @@ def registerListStyle(doc, name, rmlStyle, attributes=None, ulol=None):
         lvl_style.addElement(listProps)
         odtStyle.addElement(lvl_style)
 
+
+def registerListStyle(manager, name, rmlStyle, attributes=None, ulol=None):
+    """Registers an rmlStyle as ODF styles
+
+    rmlStyles have information both for ordered and unordered lists,
+    ODF styles do not, so we need to register two different, but similar lists.
+    """
+    if ulol is None:
+        # Register both the unordered and ordered lists. odf seem to only
+        # include the ones actually used anyway.
+        registerListStyle(manager, name, rmlStyle, attributes=attributes,
+                          ulol='ul')
+        registerListStyle(manager, name, rmlStyle, attributes=attributes,
+                          ulol='ol')
+        return
+
+    name = f'{name}-{ulol}'
+
+    odtStyle = odf.text.ListStyle(name=name)
+    addListLevels(manager, odtStyle, getListProperties(rmlStyle, attributes),
+                  ulol)
+
     pstyle = odf.style.Style(name='P%s' % name,
                              parentstylename='Standard',
                              liststylename=name,
                              family='paragraph'
                              )
-    doc.automaticstyles.addElement(pstyle)
+    manager.addStyle(pstyle)
 
     # Add the style to the doc
-    doc.automaticstyles.addElement(odtStyle)
+    manager.addStyle(odtStyle)
+
+
+def internListStyle(manager, rmlStyle, attributes, ulol, levels):
+    """Return the name of a list style for a list ``levels`` deep.
+
+    Lists with the same effective attributes share one style, which only
+    has as many levels as the deepest of those lists. Shared styles must
+    not be modified, see ``ListBase.getPrivateRootStyle``.
+    """
+    props = getListProperties(rmlStyle, attributes)
+
+    def createStyle(name):
+        style = odf.text.ListStyle(name=name)
+        style.shared = True
+        return style
+
+    name = manager.internStyle('List', (ulol, props), createStyle)
+    addListLevels(manager, manager.getStyle(name), props, ulol, levels)
+    return name
 
 
 class ListStyle(directive.RMLDirective):
@@ -736,10 +785,10 @@ class ListStyle(directive.RMLDirective):
 
         manager = attr.getManager(self)
         manager.styles[style.name] = style
-        registerListStyle(manager.document, kwargs.get('name'), style, kwargs)
+        registerListStyle(manager, kwargs.get('name'), style, kwargs)
 
 
-class Stylesheet(directive.RMLDirective):
+class Stylesheet(odt_directive.RMLDirective):
     signature = rml_stylesheet.IStylesheet
 
     factories = {
@@ -13,15 +13,19 @@
 ##############################################################################
 """``blockTableStyle``, ``blockTable``, ``row``, ``tr``, and ``td`` directives.
 """
+import array
+import csv
 from collections import defaultdict
 
 import lazy
 import lxml.etree
 import odf.table
+import odf.text
 import zope.interface
 from z3c.rml import attr, directive
 from z3c.rml import flowable as rml_flowable
 
+from shoobx.rml2odt import directive as odt_directive
 from shoobx.rml2odt import flowable, stylesheet
 from shoobx.rml2odt.interfaces import IContentContainer
 
@@ -37,24 +41,206 @@ def _styleCell():
     return sc
 
 
+def _isEmpty(element):
+    # whether a td has neither text nor children
+    return not (element.text and element.text.strip()) and not len(element)
+
+
+def _cellText(value):
+    # the text of a bulk data value, whitespace squashed like paragraphs do
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        value = str(value)
+    return ' '.join(value.split())
+
+
 def _prepCellStyle(manager, cell):
+    # Tables repeat the same looks over and over again, so all cells with
+    # equal properties share their styles.
     # Cell styling
-    cell['cellStyleName'] = manager.getNextStyleName('TableCell')
-    cell['cellStyle'] = odf.style.Style(
-        name=cell['cellStyleName'],
-        family='table-cell')
-    cell['cellStyle'].addElement(cell['cellProps'])
-
+    cell['cellStyleName'] = manager.internStyleElement(
+        'TableCell', odf.style.Style, cell['cellProps'], family='table-cell')
     # Cell Text styling
-    cell['cellContentStyleName'] = manager.getNextStyleName('CellContent')
-    cell['contentStyle'] = odf.style.Style(
-        name=cell['cellContentStyleName'],
+    cell['cellContentStyleName'] = manager.internStyleElement(
+        'CellContent', odf.style.Style, cell['textProps'], cell['paraProps'],
         family='paragraph')
-    cell['contentStyle'].addElement(cell['textProps'])
-    cell['contentStyle'].addElement(cell['paraProps'])
 
-    manager.document.automaticstyles.addElement(cell['cellStyle'])
-    manager.document.automaticstyles.addElement(cell['contentStyle'])
+
+# The property elements of a cell style, in the order of a look.
+CELL_PROPS = (
+    ('cellProps', odf.style.TableCellProperties),
+    ('paraProps', odf.style.ParagraphProperties),
+    ('textProps', odf.style.TextProperties),
+)
+
+# The look of a cell without table style, see ``_styleCell``.
+DEFAULT_LOOK = ((('verticalalign', 'bottom'),), (), ())
+
+
+def _clip(values, size):
+    # the values of a range within 0..size-1
+    if values.start < 0:
+        values = values[-(values.start // values.step):]
+    return range(values.start, min(values.stop, size), values.step)
+
+
+class StyleGrid(object):
+    """The styles of the cells of a table.
+
+    A look is the attributes of the property elements of a cell style, one
+    tuple of ``(name, value)`` pairs per ``CELL_PROPS`` entry. ``ids``
+    holds the index of the look of every cell in ``looks``, row by row.
+    Table style commands change the looks of ranges of cells; a look
+    becomes an ODF style when a cell of it asks for its style.
+    """
+
+    def __init__(self, manager, columns, rows):
+        self.manager = manager
+        self.columns = columns
+        self.rows = rows
+        self.looks = [DEFAULT_LOOK]
+        self.lookIds = {DEFAULT_LOOK: 0}
+        self.ids = array.array('I', [0]) * (columns * rows)
+        # (look id, change) -> look id
+        self.changes = {}
+        # look id -> cell style, see ``_styleCell``
+        self.cells = {}
+
+    def change(self, lookId, change):
+        """The id of look ``lookId`` with ``change`` applied.
+
+        ``change`` is a tuple of ``(CELL_PROPS index, name, value)``.
+        """
+        key = (lookId, change)
+        newId = self.changes.get(key)
+        if newId is None:
+            props = [dict(items) for items in self.looks[lookId]]
+            for index, name, value in change:
+                props[index][name] = value
+            look = tuple(tuple(items.items()) for items in props)
+            newId = self.lookIds.get(look)
+            if newId is None:
+                newId = self.lookIds[look] = len(self.looks)
+                self.looks.append(look)
+            self.changes[key] = newId
+        return newId
+
+    def fill(self, cols, rows, change, skip=()):
+        """Apply ``change`` to the cells in the ranges ``cols`` and ``rows``.
+
+        The cells at the ``(col, row)`` positions in ``skip`` are left
+        alone. Cells outside of the table are ignored.
+        """
+        width = self.columns
+        cols = _clip(cols, width)
+        rows = _clip(rows, self.rows)
+        if not change or not cols or not rows:
+            return
+        ids = self.ids
+        saved = [(row * width + col, ids[row * width + col])
+                 for col, row in skip]
+        if len(cols) == width and rows.step == 1:
+            # whole rows are one slice
+            segments = [slice(rows.start * width, rows.stop * width)]
+        else:
+            segments = (slice(row * width + cols.start,
+                              row * width + cols.stop, cols.step)
+                        for row in rows)
+        transitions = {}
+        for segment in segments:
+            old = ids[segment]
+            for lookId in set(old):
+                if lookId not in transitions:
+                    transitions[lookId] = self.change(lookId, change)
+            ids[segment] = array.array(
+                'I', map(transitions.__getitem__, old))
+        for index, lookId in saved:
+            ids[index] = lookId
+
+    def set(self, col, row, change):
+        """Apply ``change`` to one cell."""
+        self.fill(range(col, col + 1), range(row, row + 1), change)
+
+    def getCell(self, col, row):
+        """The style of a cell, see ``_styleCell``.
+
+        Cells with the same look share the returned dictionary.
+        """
+        lookId = self.ids[row * self.columns + col]
+        cell = self.cells.get(lookId)
+        if cell is None:
+            cell = {}
+            for (key, klass), items in zip(CELL_PROPS, self.looks[lookId]):
+                cell[key] = props = klass()
+                for name, value in items:
+                    props.setAttribute(name, value)
+            _prepCellStyle(self.manager, cell)
+            self.cells[lookId] = cell
+        return cell
+
+
+class SpanMap(object):
+    """The spanned cells of a table.
+
+    ODF expects ``numbercolumnsspanned`` or ``numberrowsspanned`` on the
+    cell that spans more columns/rows and a ``table:covered-table-cell``
+    instead of a ``table:table-cell`` for the cells it covers.
+
+    ``spans`` holds the ``(start_col, start_row, end_col, end_row)`` of
+    every span. Spans are indexed by the rows they cover, so tables
+    without spans cost nothing and looking a cell up only checks the
+    spans of its row.
+    """
+
+    def __init__(self):
+        self.spans = []
+        # row -> [(span, origin cell info, hidden cell info)]
+        self.byRow = {}
+
+    def add(self, start_col, start_row, end_col, end_row):
+        """Add a span, raise ``ValueError`` if it overlaps another one."""
+        span = (start_col, start_row, end_col, end_row)
+        for row in range(start_row, end_row+1):
+            for other, origin, hidden in self.byRow.get(row, ()):
+                if other[0] <= end_col and start_col <= other[2]:
+                    raise ValueError(
+                        'Span %s overlaps span %s' % (span, other))
+        origin = {
+            'type': 'S',
+            'bottomright': (end_col, end_row),
+            'attrs': {}}
+        # only the top left cell needs the span attributes
+        # only spans > 1 need to be added to the ODF
+        if end_col > start_col:
+            origin['attrs']['numbercolumnsspanned'] = end_col - start_col + 1
+        if end_row > start_row:
+            origin['attrs']['numberrowsspanned'] = end_row - start_row + 1
+        hidden = {
+            'type': 'H',
+            'origin': (start_col, start_row)}
+        entry = (span, origin, hidden)
+        for row in range(start_row, end_row+1):
+            self.byRow.setdefault(row, []).append(entry)
+        self.spans.append(span)
+
+    def get(self, col, row):
+        """The span information of a cell, ``None`` for a regular cell.
+
+        - type:
+          - S : spanned 'origin' cell
+          - H : hidden cell
+        - origin: only with H type, has (start_col, start_row)
+                  to point to the cell which caused the spanning
+        - bottomright: only with S type, has (end_col, end_row) of the span
+        - attrs: only with S type, attributes to be set on the cell
+        """
+        for span, origin, hidden in self.byRow.get(row, ()):
+            if span[0] <= col <= span[2]:
+                if col == span[0] and row == span[1]:
+                    return origin
+                return hidden
+        return None
 
 
 @zope.interface.implementer(IContentContainer)
@@ -128,13 +314,17 @@ class TableCell(flowable.Flow):
         return newCellStyle
 
     def process(self):
-        col = len(self.parent.row.childNodes)
-        row = self.parent.parent.rowCount - 1
+        table = self.parent.parent
+        col = table.column
+        row = table.rowCount - 1
+        empty = _isEmpty(self.element)
 
-        styleMap = self.parent.parent.styleMap
-        cellStyle = styleMap[col][row]
+        cellStyle = table.styleMap.getCell(col, row)
 
-        attrs = dict(self.getAttributeValues(ignore=('content',)))
+        attrs = {}
+        if self.element.attrib:
+            # all attributes are optional, none of them has a default
+            attrs = dict(self.getAttributeValues(ignore=('content',)))
         if attrs:
             # the cell has local formatting, need to patch that into the style
             cellStyle = self._copyCellStyle(cellStyle)
@@ -160,11 +350,9 @@ class TableCell(flowable.Flow):
                     linestyle = stylesheet.convertLineStyle(borders[aname])
                     cellStyle['cellProps'].setAttribute(aname, linestyle)
 
-            manager = attr.getManager(self)
-            _prepCellStyle(manager, cellStyle)
+            _prepCellStyle(table.context.manager, cellStyle)
 
-        spanMap = self.parent.parent.spanMap
-        spaninfo = spanMap[col][row]
+        spaninfo = table.spanMap.get(col, row)
         process = True
         if spaninfo is None:
             # regular cell
@@ -172,11 +360,13 @@ class TableCell(flowable.Flow):
         elif spaninfo['type'] == 'S':
             # spanned 'origin' cell
             kw = spaninfo['attrs']
+            empty = False
         elif spaninfo['type'] == 'H':
             # hidden cell
             cell = odf.table.CoveredTableCell()
             # do NOT add any content to a CoveredTableCell
             process = False
+            empty = True
 
         if process:
             # add a regular cell
@@ -185,74 +375,213 @@ class TableCell(flowable.Flow):
                 valuetype='string', **kw)
             self._convertSimpleContent(cellStyle['cellContentStyleName'])
 
-        self.parent.row.addElement(cell)
+        table.addCell(self.parent.row, cell, empty)
         self.contents = cell
-        if process:
+        if process and not empty:
             super().process()
 
 
-class TableRow(directive.RMLDirective):
+class TableRow(odt_directive.RMLDirective):
     signature = rml_flowable.ITableRow
     factories = {'td': TableCell}
 
-    def styleRow(self):
-        attribs = dict(self.parent.getAttributeValues(
-            attrMapping=self.parent.attrMapping))
+    def countEmptyCells(self):
+        # the number of cells, if none of them has content or formatting
+        cells = self.element.getchildren()
+        for cell in cells:
+            if cell.tag != 'td' or cell.attrib or not _isEmpty(cell):
+                return None
+        return len(cells)
 
-        rowProps = odf.style.TableRowProperties()
-        rowHeight = None
-        if 'rowHeights' in attribs:
-            rowHeights = attribs['rowHeights']
-            try:
-                rowHeight = rowHeights[self.parent.rowCount]
-            except IndexError:
-                # don't burp just in case RML specified less data
-                pass
-        if rowHeight is None:
-            rowProps.setAttribute('useoptimalrowheight', True)
-        else:
-            rowProps.setAttribute('rowheight', '%spt' % rowHeight)
+    def process(self):
+        self.row = self.parent.addRow(self.countEmptyCells())
+        if self.row is not None:
+            self.processSubDirectives()
 
-        manager = attr.getManager(self)
-        self.styleName = manager.getNextStyleName('TableRow')
-        style = odf.style.Style(name=self.styleName, family='table-row')
-        manager.document.automaticstyles.addElement(style)
-        style.addElement(rowProps)
-        self.parent.rowCount += 1
 
-    def process(self):
-        self.styleRow()
-        self.row = odf.table.TableRow(stylename=self.styleName)
-        self.parent.table.addElement(self.row)
-        self.processSubDirectives()
+def readBulkData(lines):
+    """Parse lines of comma separated values, the ``bulkData`` syntax.
+
+    Values are parsed as CSV, so they can be quoted to contain commas and
+    line breaks; ``lines`` keep their line endings for that. Blank lines
+    are skipped.
+    """
+    for values in csv.reader(lines, skipinitialspace=True):
+        values = [value.strip() for value in values]
+        if values and values != ['']:
+            yield values
+
+
+def parseBulkData(text):
+    """The rows of the text of a ``bulkData`` tag."""
+    return list(readBulkData((text or '').splitlines(True)))
+
+
+class RowSource(object):
+    """Rows streamed into a ``blockTable`` by a ``bulkData`` tag.
+
+    ``rows`` is an iterable of rows, each a sequence of values; ``None``
+    is an empty cell, other values are converted to text. The table needs
+    its dimensions before it gets to the rows. Unless ``count`` and
+    ``columns`` are given, ``rows`` is iterated one more time to find them,
+    so iterators are read into a list then.
+    """
+
+    def __init__(self, rows, count=None, columns=None):
+        if (count is None or columns is None) and iter(rows) is rows:
+            rows = list(rows)
+        self.rows = rows
+        self.count = count
+        self.columns = columns
+
+    def iterRows(self):
+        return iter(self.rows)
+
+    def measure(self):
+        count = columns = 0
+        for values in self.iterRows():
+            count += 1
+            columns = max(columns, len(values))
+        if self.count is None:
+            self.count = count
+        if self.columns is None:
+            self.columns = columns
+
+    def __len__(self):
+        if self.count is None:
+            self.measure()
+        return self.count
+
+    def getColumns(self):
+        if self.columns is None:
+            self.measure()
+        return self.columns
+
+    def __iter__(self):
+        return self.iterRows()
+
+
+class CSVRowSource(RowSource):
+    """Rows read from a CSV file with the ``bulkData`` syntax.
+
+    The file is read twice, first to count the rows, unless ``count`` and
+    ``columns`` are given.
+    """
+
+    def __init__(self, path, count=None, columns=None, encoding='utf-8'):
+        self.path = path
+        self.count = count
+        self.columns = columns
+        self.encoding = encoding
+
+    def iterRows(self):
+        with open(self.path, encoding=self.encoding, newline='') as data:
+            yield from readBulkData(data)
+
+
+class ITableBulkData(rml_flowable.ITableBulkData):
+    """Bulk data, inline or streamed from a file or a row source."""
+
+    src = attr.File(
+        title='Source File',
+        description='A CSV file the rows are read from.',
+        doNotOpen=True,
+        required=False)
+
+    source = attr.Text(
+        title='Row Source',
+        description=('The name of a row source passed to the conversion, '
+                     'see ``Document.rowSources``.'),
+        required=False)
 
 
 class TableBulkData(directive.RMLDirective):
-    signature = rml_flowable.ITableBulkData
+    signature = ITableBulkData
+
+    def getRowSource(self):
+        attrs = dict(self.getAttributeValues(select=('src', 'source')))
+        if 'source' in attrs:
+            manager = attr.getManager(self)
+            try:
+                rows = manager.rowSources[attrs['source']]
+            except KeyError:
+                raise ValueError('Unknown row source %r. %s' % (
+                    attrs['source'], attr.getFileInfo(self)))
+            if not isinstance(rows, RowSource):
+                rows = RowSource(rows)
+            return rows
+        if 'src' in attrs:
+            return CSVRowSource(attrs['src'])
+        return RowSource(parseBulkData(self.element.text))
+
+    def getSourceName(self):
+        return (self.element.get('source') or self.element.get('src') or
+                self.element.tag)
 
     def process(self):
-        # Retrieves the text in the bulkData tag.
-        lines = [x.strip() for x in self.element.text.splitlines()]
-        # Converts the retrieved text into tr and td tags
-        for rowData in lines:
-            newRow = lxml.etree.Element('tr')
-            cells = rowData.split(',')
-            for cell in cells:
-                newCell = lxml.etree.Element('td')
-                newCell.text = cell
-                newRow.append(newCell)
-            self.parent.element.append(newRow)
-        # Removes bulkData object so that recursion loop does not occur
-        self.parent.element.remove(self.element)
-        # Cheating: reprocess the blockTable again,
-        # that we added the rows and columns above
-        self.parent.process()
+        # The table got the rows already to know its dimensions. The
+        # values are plain text, so the rows and cells are added directly
+        # instead of going through ``tr`` and ``td``.
+        table = self.parent
+        source = table.bulkData[self.element]
+        count, columns = len(source), source.getColumns()
+        for index, values in enumerate(source):
+            # The table is sized and styled for the declared dimensions.
+            if index >= count:
+                raise ValueError('Row source %r has more than %d rows. %s' % (
+                    self.getSourceName(), count, attr.getFileInfo(self)))
+            if len(values) > columns:
+                raise ValueError(
+                    'Row %d of row source %r has more than %d columns. %s' % (
+                        index, self.getSourceName(), columns,
+                        attr.getFileInfo(self)))
+            values = [_cellText(value) for value in values]
+            row = table.addRow(None if any(values) else len(values))
+            if row is None:
+                # repeats the previous row
+                continue
+            rowIdx = table.rowCount - 1
+            for col, value in enumerate(values):
+                spaninfo = table.spanMap.get(col, rowIdx)
+                if spaninfo is None:
+                    kw = {}
+                elif spaninfo['type'] == 'S':
+                    kw = spaninfo['attrs']
+                else:
+                    table.addCell(row, odf.table.CoveredTableCell(), True)
+                    continue
+                cellStyle = table.styleMap.getCell(col, rowIdx)
+                cell = odf.table.TableCell(
+                    stylename=cellStyle['cellStyleName'],
+                    valuetype='string', **kw)
+                if value:
+                    para = odf.text.P(
+                        stylename=cellStyle['cellContentStyleName'])
+                    para.addElement(odf.text.Span(text=value))
+                    cell.addElement(para)
+                table.addCell(row, cell, not value and not kw)
 
 
 class UnsupportedCoordinate(Exception):
     pass
 
 
+class TableContext(object):
+    """The attributes of a table, parsed once for all rows and cells."""
+
+    def __init__(self, table):
+        self.manager = attr.getManager(table)
+        self.attributes = dict(table.getAttributeValues())
+        # the blockTableStyle directive
+        self.style = self.attributes.get('style')
+        self.colWidths = self.attributes.get('colWidths') or []
+        self.rowHeights = self.attributes.get('rowHeights') or []
+        self.columns = table.columns
+        self.rows = table.rows
+        # row height -> row style name
+        self.rowStyleNames = {}
+
+
 class BlockTable(flowable.Flowable):
     signature = rml_flowable.IBlockTable
     factories = {
@@ -274,84 +603,43 @@ class BlockTable(flowable.Flowable):
 
         # negative indexes are like python lists, count from right
         # also sort on the index
-        cols = sorted([col if col >= 0 else self.columns+col
+        columns, rows = self.context.columns, self.context.rows
+        cols = sorted([col if col >= 0 else columns+col
                        for col in [start_col, end_col]])
-        rows = sorted([row if row >= 0 else self.rows+row
+        rows = sorted([row if row >= 0 else rows+row
                        for row in [start_row, end_row]])
 
         # return start_col, start_row, end_col, end_row
         return cols[0], rows[0], cols[1], rows[1]
 
-    def _getOriginCellPos(self, col, row):
-        # the problem is with spanned cells, to draw a bottom/right border
-        # on a spanned region we need to find the origin cell
-        spaninfo = self.spanMap[col][row]
-        if spaninfo is None:
-            # regular cell
-            return col, row
-        elif spaninfo['type'] == 'S':
-            # spanned 'origin' cell
-            return col, row
-        elif spaninfo['type'] == 'H':
-            # this is a 'hidden' cell, need to find the cell which caused this
-            originCol, originRow = spaninfo['origin']
-            return originCol, originRow
-        return col, row
-
-    def _getBottomRightCellPos(self, col, row):
-        # the problem is with spanned cells,
-        # to NOT to draw a bottom/right border
-        # on a spanned region we need to find that info
-        spaninfo = self.spanMap[col][row]
-        if spaninfo is None:
-            # regular cell
-            return col, row
-        elif spaninfo['type'] == 'S':
-            # spanned 'origin' cell, return the bottomright coordinates
-            return spaninfo['bottomright']
-        elif spaninfo['type'] == 'H':
-            # this is a 'hidden' cell
-            return col, row
-        return col, row
-
     def _doZebraRows(self, stylemap, attrs):
         start_col, start_row, end_col, end_row = self._getStartEndPos(attrs)
         colors = attrs['cellProps']['backgroundcolors']
-        for col in range(start_col, end_col+1):
-            idx = 0
-            for row in range(start_row, end_row+1):
-                cell = stylemap[col][row]
-                if colors[idx]:
-                    cell['cellProps'].setAttribute(
-                        'backgroundcolor', colors[idx])
-                idx += 1
-                if idx >= len(colors):
-                    idx = 0
+        for idx, color in enumerate(colors):
+            if color:
+                stylemap.fill(
+                    range(start_col, end_col+1),
+                    range(start_row+idx, end_row+1, len(colors)),
+                    ((0, 'backgroundcolor', color),))
 
     def _doZebraCols(self, stylemap, attrs):
         start_col, start_row, end_col, end_row = self._getStartEndPos(attrs)
         colors = attrs['cellProps']['backgroundcolors']
-        idx = 0
-        for col in range(start_col, end_col+1):
-            for row in range(start_row, end_row+1):
-                cell = stylemap[col][row]
-                if colors[idx]:
-                    cell['cellProps'].setAttribute(
-                        'backgroundcolor', colors[idx])
-            idx += 1
-            if idx >= len(colors):
-                idx = 0
+        for idx, color in enumerate(colors):
+            if color:
+                stylemap.fill(
+                    range(start_col+idx, end_col+1, len(colors)),
+                    range(start_row, end_row+1),
+                    ((0, 'backgroundcolor', color),))
 
     def _applyAttributes(self, stylemap, attrs):
         start_col, start_row, end_col, end_row = self._getStartEndPos(attrs)
-
-        for col in range(start_col, end_col+1):
-            for row in range(start_row, end_row+1):
-                cell = stylemap[col][row]
-
-                for attrKey in ('cellProps', 'paraProps', 'textProps'):
-                    for aname, avalue in attrs[attrKey].items():
-                        cell[attrKey].setAttribute(aname, avalue)
+        change = tuple(
+            (index, aname, avalue)
+            for index, (attrKey, klass) in enumerate(CELL_PROPS)
+            for aname, avalue in attrs[attrKey].items())
+        stylemap.fill(
+            range(start_col, end_col+1), range(start_row, end_row+1), change)
 
     def _doInnerGrid(self, stylemap, attrs):
         start_col, start_row, end_col, end_row = self._getStartEndPos(attrs)
@@ -359,39 +647,46 @@ class BlockTable(flowable.Flowable):
         if start_row == end_row and start_col == end_col:
             return
 
-        border = attrs['border']
-
-        for col in range(start_col, end_col+1):
-            for row in range(start_row, end_row+1):
-                brcol, brrow = self._getBottomRightCellPos(col, row)
-                # we still need to set props in the current cell
-                cell = stylemap[col][row]
-                # but check the (spanned) bottom right coordinates
-                if brcol != end_col:
-                    cell['cellProps'].setAttribute('borderright', border)
-                if brrow != end_row:
-                    cell['cellProps'].setAttribute('borderbottom', border)
+        right = ((0, 'borderright', attrs['border']),)
+        bottom = ((0, 'borderbottom', attrs['border']),)
+        # spanned cells need their bottom right coordinates checked
+        spans = [span for span in self.spanMap.spans
+                 if start_col <= span[0] <= end_col and
+                 start_row <= span[1] <= end_row]
+        skip = [span[:2] for span in spans]
+        stylemap.fill(range(start_col, end_col),
+                      range(start_row, end_row+1), right, skip)
+        stylemap.fill(range(start_col, end_col+1),
+                      range(start_row, end_row), bottom, skip)
+        for col, row, brcol, brrow in spans:
+            if brcol != end_col:
+                stylemap.set(col, row, right)
+            if brrow != end_row:
+                stylemap.set(col, row, bottom)
 
     def _doOutline(self, stylemap, attrs):
         start_col, start_row, end_col, end_row = self._getStartEndPos(attrs)
 
         border = attrs['border']
-
-        for col, attrKey in [
-                (start_col, 'borderleft'), (end_col, 'borderright')]:
-            for row in range(start_row, end_row+1):
-                # to get the outline right, we need to set border props
-                # on the 'origin' cell
-                mcol, mrow = self._getOriginCellPos(col, row)
-                cell = stylemap[mcol][mrow]
-                cell['cellProps'].setAttribute(attrKey, border)
-
-        for row, attrKey in [
-                (start_row, 'bordertop'), (end_row, 'borderbottom')]:
-            for col in range(start_col, end_col+1):
-                mcol, mrow = self._getOriginCellPos(col, row)
-                cell = stylemap[mcol][mrow]
-                cell['cellProps'].setAttribute(attrKey, border)
+        spans = self.spanMap.spans
+
+        for cols, rows, attrKey in [
+                (range(start_col, start_col+1), range(start_row, end_row+1),
+                 'borderleft'),
+                (range(end_col, end_col+1), range(start_row, end_row+1),
+                 'borderright'),
+                (range(start_col, end_col+1), range(start_row, start_row+1),
+                 'bordertop'),
+                (range(start_col, end_col+1), range(end_row, end_row+1),
+                 'borderbottom')]:
+            change = ((0, attrKey, border),)
+            # hidden cells are not displayed, to get the outline right,
+            # we need to set border props on the 'origin' cell
+            stylemap.fill(cols, rows, change)
+            for col, row, brcol, brrow in spans:
+                if (col <= cols[-1] and brcol >= cols[0] and
+                        row <= rows[-1] and brrow >= rows[0]):
+                    stylemap.set(col, row, change)
 
     def _executeCommand(self, stylemap, tagname, styleCommand):
         attrs = styleCommand.getStyleProps()
@@ -423,92 +718,43 @@ class BlockTable(flowable.Flowable):
 
     def getStyleMap(self):
         # prepare a map of styles for each cell in the table
-        stylemap = [
-            [_styleCell()
-             for r in range(self.rows)] for c in range(self.columns)]
-        table_style = self.getAttributeValues(select=['style'])
-        if table_style:
-            table_style = table_style[0][1]
-
+        context = self.context
+        stylemap = StyleGrid(context.manager, context.columns, context.rows)
+        table_style = context.style
+        if table_style is not None:
             for tagname, styleCommands in table_style.collector.items():
                 for styleCommand in styleCommands:
                     self._executeCommand(stylemap, tagname, styleCommand)
 
-        manager = attr.getManager(self)
-        for row in stylemap:
-            for cell in row:
-                _prepCellStyle(manager, cell)
-
         return stylemap
 
     def getSpanMap(self):
-        # prepare a map of spanned cells
-        # ODF expects `numbercolumnsspanned` or `numberrowsspanned` on
-        # the cell that spans more columns/rows
-        # ODF also expects `table:covered-table-cell`
-        # instead of a table:table-cell when a cell should not be 'displayed'
-        #
-        # None in a spanMap cell means it's a 'regular' cell
-        # spaninfo structure:
-        # - type:
-        #   - S : spanned 'origin' cell
-        #   - H : hidden cell
-        # - origin: only with H type spaninfo, has (start_col, start_row)
-        #           to point to the cell which caused the spanning
-        #           to be used by getStyleMap
-        # - bottomright: only with S type spaninfo
-        #                has (end_col, end_row) of the span
-        #                to be used by getStyleMap
-        # - attrs: only with S type spaninfo
-        #          attributes to be set on the cell
-        spanmap = [
-            [None for r in range(self.rows)] for c in range(self.columns)]
-        table_style = self.getAttributeValues(select=['style'])
-        if table_style:
-            table_style = table_style[0][1]
-
+        # prepare the map of spanned cells, getStyleMap will use it
+        spanmap = SpanMap()
+        table_style = self.context.style
+        if table_style is not None:
             for blockspan in table_style.collector['blockSpan']:
                 attrs = dict(blockspan.getAttributeValues())
                 start_col, start_row, end_col, end_row = \
                     self._getStartEndPos(attrs)
 
-                columnsspanned = end_col - start_col + 1
-                rowsspanned = end_row - start_row + 1
-
-                if columnsspanned == 1 and rowsspanned == 1:
+                if start_col == end_col and start_row == end_row:
                     continue
 
-                # mark all spanned cells
-                for col in range(start_col, end_col+1):
-                    for row in range(start_row, end_row+1):
-                        spaninfo = {
-                            'type': 'H',
-                            'origin': (start_col, start_row)}
-                        spanmap[col][row] = spaninfo
-
-                spaninfo = {
-                    'type': 'S',
-                    'bottomright': (end_col, end_row),
-                    'attrs': {}}
-                # only the top left cell needs the span attributes
-                # only spans > 1 need to be added to the ODF
-                if columnsspanned > 1:
-                    spaninfo['attrs']['numbercolumnsspanned'] = columnsspanned
-                if rowsspanned > 1:
-                    spaninfo['attrs']['numberrowsspanned'] = rowsspanned
-                spanmap[start_col][start_row] = spaninfo
+                try:
+                    spanmap.add(start_col, start_row, end_col, end_row)
+                except ValueError as err:
+                    raise ValueError('%s. %s' % (
+                        err, directive.getFileInfo(blockspan)))
         return spanmap
 
     def addColumns(self):
-        attribs = dict(self.getAttributeValues())
-        colWidths = attribs.get('colWidths', [])
+        colWidths = self.context.colWidths
 
-        manager = attr.getManager(self)
-        for idx in range(self.columns):
+        manager = self.context.manager
+        column = lastStyleName = None
+        for idx in range(self.context.columns):
             # Create a style for each column
-            styleName = manager.getNextStyleName('TableColumn')
-            style = odf.style.Style(name=styleName, family='table-column')
-            manager.document.automaticstyles.addElement(style)
             colProps = odf.style.TableColumnProperties()
             # Apply the width if available.
             if colWidths:
@@ -526,17 +772,84 @@ class BlockTable(flowable.Flowable):
                         #       measurements like mm, does some relative width
                         #       based on the values
                         colProps.setAttribute('columnwidth', colWidth)
-            style.addElement(colProps)
-
-            self.table.addElement(odf.table.TableColumn(stylename=styleName))
-
-    def haveBulkData(self):
-        # Checks if we a bulkData tag and dynamically adds colWidths and
-        # rowHeights to the parent (blockTable)
-        for element in self.element.getchildren():
-            if element.tag == 'bulkData':
-                return True
-        return False
+            styleName = manager.internStyleElement(
+                'TableColumn', odf.style.Style, colProps,
+                family='table-column')
+
+            # adjacent equal columns are one repeated column
+            if styleName == lastStyleName:
+                repeated += 1
+                column.setAttribute('numbercolumnsrepeated', repeated)
+                continue
+            column = odf.table.TableColumn(stylename=styleName)
+            self.table.addElement(column)
+            lastStyleName = styleName
+            repeated = 1
+
+    def addRow(self, emptyCells=None):
+        """Add the next row to the table and return it.
+
+        ``emptyCells`` is the number of cells of a row without content.
+        Adjacent equal empty rows are one repeated row, ``None`` is
+        returned for the repetitions.
+        """
+        context = self.context
+        rowHeight = None
+        try:
+            rowHeight = context.rowHeights[self.rowCount]
+        except IndexError:
+            # don't burp just in case RML specified less data
+            pass
+        styleName = context.rowStyleNames.get(rowHeight)
+        if styleName is None:
+            rowProps = odf.style.TableRowProperties()
+            if rowHeight is None:
+                rowProps.setAttribute('useoptimalrowheight', True)
+            else:
+                rowProps.setAttribute('rowheight', '%spt' % rowHeight)
+            styleName = context.manager.internStyleElement(
+                'TableRow', odf.style.Style, rowProps, family='table-row')
+            context.rowStyleNames[rowHeight] = styleName
+        rowIdx = self.rowCount
+        self.rowCount += 1
+        self.column = 0
+        self.lastCellKey = None
+
+        key = None
+        if emptyCells is not None and rowIdx not in self.spanMap.byRow:
+            key = (styleName,) + tuple(
+                self.styleMap.getCell(col, rowIdx)['cellStyleName']
+                for col in range(emptyCells))
+            if key == self.lastRowKey:
+                self.lastRowRepeated += 1
+                self.lastRow.setAttribute(
+                    'numberrowsrepeated', self.lastRowRepeated)
+                return None
+        row = odf.table.TableRow(stylename=styleName)
+        self.table.addElement(row)
+        self.lastRow = row
+        self.lastRowKey = key
+        self.lastRowRepeated = 1
+        return row
+
+    def addCell(self, row, cell, empty=False):
+        """Add ``cell`` as the next cell of ``row``, the current row.
+
+        Adjacent equal ``empty`` cells are one repeated cell.
+        """
+        self.column += 1
+        key = None
+        if empty:
+            key = (cell.qname, tuple(sorted(cell.attributes.items())))
+            if key == self.lastCellKey:
+                self.lastCellRepeated += 1
+                self.lastCell.setAttribute(
+                    'numbercolumnsrepeated', self.lastCellRepeated)
+                return
+        row.addElement(cell)
+        self.lastCell = cell
+        self.lastCellKey = key
+        self.lastCellRepeated = 1
 
     def haveBlockTableStyle(self):
         for element in self.element.getchildren():
@@ -546,52 +859,70 @@ class BlockTable(flowable.Flowable):
                 self.element.attrib['style'] = element.attrib['id']
 
     def process(self):
-        # if we have a bulkData tag, let's have first TableBulkData
-        # process the data by adding tr and td tags
-        # XXX: might be simpler to grasp if this would be done here
-        #      and we'd just drop the bulkData child tag
-        if not self.haveBulkData():
-            self.haveBlockTableStyle()
-            # it's important to first figure spanMap, getStyleMap will use it!
-            self.spanMap = self.getSpanMap()
-            self.styleMap = self.getStyleMap()
-            self.rowCount = 0
-            manager = attr.getManager(self)
-
-            if 'style' in self.element.attrib:
-                styleName = self.element.attrib.get('style')
-            else:
-                styleName = manager.getNextStyleName('Table')
-                style = odf.style.Style(name=styleName, family='table')
-                manager.document.automaticstyles.addElement(style)
-                # XXX: not sure that we always want 100% width
-                tableProps = odf.style.TableProperties(relwidth='100%')
-                style.addElement(tableProps)
-
-                if isinstance(self.parent, flowable.KeepTogether):
-                    tableProps.setAttribute('maybreakbetweenrows', False)
-
-            self.table = odf.table.Table(stylename=styleName)
-            if isinstance(self.parent, TableCell):
-                # a table in a table
-                self.table.setAttribute('issubtable', 'true')
-
-            # ODT doesn't allow tables in list-items
-            # handling a blockTable in a ListItem is done with
-            # shoobx.rml2odt.list.BlockTableInList
-            self.contents.addElement(self.table)
-
-            self.addColumns()
+        self.haveBlockTableStyle()
+        # it's important to first figure spanMap, getStyleMap will use it!
+        self.spanMap = self.getSpanMap()
+        self.styleMap = self.getStyleMap()
+        self.rowCount = 0
+        self.lastRowKey = None
+        manager = self.context.manager
+
+        if 'style' in self.element.attrib:
+            styleName = self.element.attrib.get('style')
+        else:
+            # XXX: not sure that we always want 100% width
+            tableProps = odf.style.TableProperties(relwidth='100%')
+            if isinstance(self.parent, flowable.KeepTogether):
+                tableProps.setAttribute('maybreakbetweenrows', False)
+            styleName = manager.internStyleElement(
+                'Table', odf.style.Style, tableProps, family='table')
+
+        self.table = odf.table.Table(stylename=styleName)
+        if isinstance(self.parent, TableCell):
+            # a table in a table
+            self.table.setAttribute('issubtable', 'true')
+
+        # ODT doesn't allow tables in list-items
+        # handling a blockTable in a ListItem is done with
+        # shoobx.rml2odt.list.BlockTableInList
+        self.contents.addElement(self.table)
+
+        self.addColumns()
         self.processSubDirectives()
 
+    @lazy.lazy
+    def bulkData(self):
+        # the row source of every bulkData tag
+        return {element: TableBulkData(element, self).getRowSource()
+                for element in self.element.getchildren()
+                if element.tag == 'bulkData'}
+
+    @lazy.lazy
+    def context(self):
+        # the table style has to be in place, see haveBlockTableStyle
+        return TableContext(self)
+
+    @lazy.lazy
+    def dimensions(self):
+        # (columns, rows) in one pass over the children
+        columns = rows = 0
+        for element in self.element.getchildren():
+            if element.tag == 'tr':
+                rows += 1
+                columns = max(columns, len(
+                    [e for e in element.getchildren() if e.tag == 'td']))
+        for source in self.bulkData.values():
+            rows += len(source)
+            columns = max(columns, source.getColumns())
+        return columns, rows
+
     @lazy.lazy
     def rows(self):
-        return len([e for e in self.element.getchildren() if e.tag == 'tr'])
+        return self.dimensions[1]
 
     @lazy.lazy
     def columns(self):
-        return max([len([e for e in row.getchildren() if e.tag == 'td'])
-                    for row in self.element.getchildren()])
+        return self.dimensions[0]
 
 
 flowable.Flow.factories['blockTable'] = BlockTable
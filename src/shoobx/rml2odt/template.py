@@ -13,15 +13,14 @@
 ##############################################################################
 """Style Related Element Processing
 """
-import copy
-
 import odf
 import zope.interface
 from odf.namespaces import STYLENS
-from z3c.rml import attr, directive
+from z3c.rml import attr
 from z3c.rml import template as rml_template
 
-from shoobx.rml2odt import flowable
+from shoobx.rml2odt import directive as odt_directive
+from shoobx.rml2odt import flowable, stylesheet
 from shoobx.rml2odt.interfaces import IContentContainer
 
 
@@ -49,7 +48,7 @@ class Footer(Header):
     klass = staticmethod(odf.style.Footer)
 
 
-class PageTemplate(directive.RMLDirective):
+class PageTemplate(odt_directive.RMLDirective):
     signature = rml_template.IPageTemplate
     factories = {
         'header': Header,
@@ -58,13 +57,10 @@ class PageTemplate(directive.RMLDirective):
 
     def process(self):
         manager = attr.getManager(self)
-        styleName = manager.getNextStyleName('Mpm')
-
         pageLayoutProps = odf.style.PageLayoutProperties(
             **self.parent.styleArgs)
-        pageLayout = odf.style.PageLayout(name=styleName)
-        pageLayout.addElement(pageLayoutProps)
-        manager.document.automaticstyles.addElement(pageLayout)
+        styleName = manager.internStyleElement(
+            'Mpm', odf.style.PageLayout, pageLayoutProps)
 
         args = dict(self.getAttributeValues())
         self.content = odf.style.MasterPage(
@@ -74,7 +70,7 @@ class PageTemplate(directive.RMLDirective):
         self.processSubDirectives()
 
 
-class Template(directive.RMLDirective):
+class Template(odt_directive.RMLDirective):
     signature = rml_template.ITemplate
     attrMapping = {'bottomMargin': 'marginbottom',
                    'topMargin': 'margintop',
@@ -131,7 +127,7 @@ class Template(directive.RMLDirective):
                     if self._getNodeName(pt).lower() == 'main':
                         mainPT = pt
             if mainPT is not None:
-                newPT = copy.deepcopy(mainPT)
+                newPT = stylesheet.cloneNode(mainPT)
                 newPT.setAttrNS(STYLENS, 'name', 'Standard')
                 newPT.setAttrNS(STYLENS, 'display-name', 'Standard')
 
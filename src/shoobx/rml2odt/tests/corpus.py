@@ -0,0 +1,143 @@
+##############################################################################
+#
+# Copyright (c) 2017 Shoobx, Inc.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""The RML documents converted by the tests and the benchmarks
+"""
+import os
+
+INPUT_DIR = os.path.join(os.path.dirname(__file__), "test_data", "input")
+OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "test_data", "output")
+EXPECT_DIR = os.path.join(os.path.dirname(__file__), "test_data", "expected")
+
+Z3C_RML_INPUT_DIR = os.path.join(os.path.dirname(__file__), "z3c_rml_tests", "input")
+Z3C_RML_OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "z3c_rml_tests", "output")
+Z3C_RML_EXPECT_DIR = os.path.join(
+    os.path.dirname(__file__), "z3c_rml_tests", "expected"
+)
+
+Z3C_RML_BLACKLIST = (
+    "printScaling.rml",
+    "rml-examples-000-simple.rml",
+    "rml-examples-001-cmbox.rml",
+    "rml-examples-003-frames.rml",
+    "rml-examples-004-fpt-templates.rml",
+    "rml-examples-004-templates.rml",
+    "rml-examples-005-fonts.rml",
+    "rml-examples-006-barcodes.rml",
+    "rml-examples-009-splitting.rml",
+    "rml-examples-010-linkURL.rml",
+    "rml-examples-017-outlines.rml",
+    "rml-examples-029-keepinframe.rml",
+    "rml-examples-032-images.rml",
+    "rml-examples-034-cmyk.rml",
+    "rml-examples-035-numbering.rml",
+    "rml-examples-036-numbering-contd.rml",
+    "rml-examples-037-plugingraphic.rml",
+    "rml-examples-038-rect-href.rml",
+    "rml-examples-039-doc-programming.rml",
+    "rml-examples-041-masking.rml",
+    "rml-examples-042-longdoc.rml",
+    "rml-examples-044-codesnippets.rml",
+    "rml-examples-045-cmyk.rml",
+    "rml-examples-047-condPageBreak.rml",
+    "rml-examples-048-paragraph-flow-controls.rml",
+    "rml-guide-example-01.rml",
+    "rml-guide-example-02.rml",
+    "rml-guide-example-03.rml",
+    "rml-guide-example-04.rml",
+    "rml-guide-example-05.rml",
+    "rml-guide-example-06.rml",
+    "rml-guide-example-07.rml",
+    "rml-guide-example-08.rml",
+    "rml-guide-example-09.rml",
+    "rml-guide-example-10.rml",
+    "rml-guide-example-11.rml",
+    "rml-guide-example-12.rml",
+    "special-text.rml",
+    "symbols-set.rml",
+    "tag-alias.rml",
+    "tag-barChart.rml",
+    "tag-barChart3d.rml",
+    "tag-barcode.rml",
+    "tag-buttonField.rml",
+    "tag-circle.rml",
+    "tag-codesnippet.rml",
+    "tag-color.rml",
+    "tag-condPageBreak.rml",
+    "tag-cropMarks.rml",
+    "tag-curves.rml",
+    "tag-doc.rml",
+    "tag-document-pageDrawing.rml",
+    "tag-drawAlignedString.rml",
+    "tag-drawString.rml",
+    "tag-drawRightString.rml",
+    "tag-drawCenteredString.rml",
+    "tag-ellipse.rml",
+    "tag-fill.rml",
+    "tag-fixedSize.rml",
+    "tag-grid.rml",
+    "tag-illustration.rml",
+    "tag-image.rml",
+    "tag-image-1.rml",
+    "tag-image-data-uri.rml",
+    "tag-image-mask.rml",
+    "tag-image-svg.rml",
+    "tag-imageAndFlowables.rml",
+    "tag-imageAndFlowables-svg.rml",
+    "tag-includePdfPages.rml",
+    "tag-indent.rml",
+    "tag-index.rml",
+    "tag-keepInFrame.rml",
+    "tag-keepTogether.rml",
+    "tag-lines.rml",
+    "tag-lineMode.rml",
+    "tag-linePlot.rml",
+    "tag-linePlot3D.rml",
+    "tag-log.rml",
+    "tag-mergePage.rml",
+    "tag-name.rml",
+    "tag-nextFrame.rml",
+    "tag-outlineAdd.rml",
+    "tag-pageGraphics.rml",
+    "tag-pageInfo.rml",
+    "tag-pageInfo-2.rml",
+    "tag-pageNumber.rml",
+    "tag-para-wordWrap.rml",
+    "tag-path.rml",
+    "tag-pieChart.rml",
+    "tag-pieChart3d.rml",
+    "tag-place.rml",
+    "tag-plugInFlowable.rml",
+    "tag-plugInGraphic.rml",
+    "tag-pto.rml",
+    "tag-rectange.rml",
+    "tag-registerCidFont.rml",
+    "tag-registerTTFont.rml",
+    "tag-registerType1Face.rml",
+    "tag-rotate.rml",
+    "tag-saveState-restoreState.rml",
+    "tag-scale.rml",
+    "tag-selectField.rml",
+    "tag-setFont.rml",
+    "tag-setFontSize.rml",
+    "tag-setNextFrame.rml",
+    "tag-setNextTemplate.rml",
+    "tag-skew.rml",
+    "tag-spiderChart.rml",
+    "tag-storyPlace.rml",
+    "tag-stroke.rml",
+    "tag-textAnnotation.rml",
+    "tag-textField.rml",
+    "tag-transform.rml",
+    "tag-translate.rml",
+)
@@ -14,9 +14,31 @@
 """RML to DOCX Converter Tests
 """
 
+import os
+import shutil
+import tempfile
 import unittest
+import zipfile
 
-from shoobx.rml2odt import document, flowable
+import odf.text
+from odf.opendocument import OpenDocumentText
+
+from shoobx.rml2odt import document, flowable, imagecache, rml2odt, template
+
+IMAGE = os.path.join(
+    os.path.dirname(__file__), 'test_data', 'input', 'shoobx.png')
+
+IMAGE_RML = """<document filename="image.pdf">
+  <template>
+    <pageTemplate id="main">
+      <frame id="first" x1="1cm" y1="1cm" width="19cm" height="26cm"/>
+    </pageTemplate>
+  </template>
+  <story>
+    <img src="%s" />
+    <img src="data:image/gif;base64,R0lGODlhAQABAAAAACw=" />
+  </story>
+</document>"""
 
 
 class ParagraphTests(unittest.TestCase):
@@ -53,6 +75,41 @@ class ParagraphTests(unittest.TestCase):
         out = self._processOut(out)
         self.assertEqual(out, 'two  words.  ')
 
+    def test_addSpan_internsTextStyles(self):
+        doc = document.Document(None)
+        doc.document = OpenDocumentText()
+        para = flowable.Paragraph(ElementMock(), doc)
+        para.odtParagraph = odf.text.P()
+
+        plain = para.addSpan('plain')
+        self.assertIsNone(plain.getAttribute('stylename'))
+
+        para.bold = True
+        first = para.addSpan('bold')
+        second = para.addSpan('bold again')
+        para.italic = True
+        third = para.addSpan('bold italic')
+
+        self.assertEqual(first.getAttribute('stylename'), 'T1')
+        self.assertEqual(second.getAttribute('stylename'), 'T1')
+        self.assertEqual(third.getAttribute('stylename'), 'T2')
+        self.assertEqual(len(doc.document.styles.childNodes), 2)
+
+    def test_addSpan_declaresFontFaceOnce(self):
+        doc = document.Document(None)
+        doc.document = OpenDocumentText()
+        para = flowable.Paragraph(ElementMock(), doc)
+        para.odtParagraph = odf.text.P()
+
+        para.fontName = 'Helvetica-Bold'
+        para.addSpan('bold')
+        para.fontSize = 14
+        para.addSpan('bigger')
+        self.assertEqual(doc.addFontFace('Helvetica'), 'Arial')
+
+        self.assertEqual(doc.fontFaces, {'Arial'})
+        self.assertEqual(len(doc.document.fontfacedecls.childNodes), 1)
+
     def _processOut(self, out):
         val = []
         for c in out.childNodes:
@@ -63,6 +120,108 @@ class ParagraphTests(unittest.TestCase):
         return ''.join(val)
 
 
+class FlowableStylesTests(unittest.TestCase):
+
+    def test_nextPage_sharesStyle(self):
+        doc = document.Document(None)
+        doc.document = OpenDocumentText()
+        story = template.Story(ElementMock(), doc)
+
+        flowable.NextPage(ElementMock(), story).process()
+        flowable.NextPage(ElementMock(), story).process()
+
+        paras = doc.document.text.childNodes
+        self.assertEqual(len(paras), 2)
+        self.assertEqual(paras[0].getAttribute('stylename'), 'PageBreak1')
+        self.assertEqual(paras[1].getAttribute('stylename'), 'PageBreak1')
+        self.assertEqual(len(doc.document.automaticstyles.childNodes), 1)
+
+
+class ImageCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = imagecache.cache
+        imagecache.cache = imagecache.ImageCache()
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        imagecache.cache = self.cache
+        shutil.rmtree(self.tmpdir)
+
+    def test_lru(self):
+        cache = imagecache.ImageCache(maxsize=10)
+        for key in 'abc':
+            cache.add(key, imagecache.ImageAsset(b'1234', 'image/png', key))
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b').digest, 'b')
+        cache.add('d', imagecache.ImageAsset(b'1234', 'image/png', 'd'))
+        # b was used more recently than c
+        self.assertIsNone(cache.get('c'))
+        self.assertEqual(cache.info(), (1, 2, 10, 8, 2))
+        # Too big for the cache at all
+        cache.add('e', imagecache.ImageAsset(b'x' * 11, 'image/png', 'e'))
+        self.assertIsNone(cache.get('e'))
+
+    def test_imagesAreCached(self):
+        path = os.path.join(self.tmpdir, 'logo.png')
+        shutil.copy(IMAGE, path)
+        rml = IMAGE_RML % path
+
+        rml2odt.convertToBytes(rml)
+        self.assertEqual(imagecache.cache.info().misses, 2)
+        self.assertEqual(imagecache.cache.info().entries, 2)
+        rml2odt.convertToBytes(rml)
+        self.assertEqual(imagecache.cache.info().hits, 2)
+
+        # A modified file is loaded again.
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        rml2odt.convertToBytes(rml)
+        self.assertEqual(imagecache.cache.info()[:2], (3, 3))
+
+
+class BarCodeFlowableTests(unittest.TestCase):
+
+    rml = """<document filename="qr.pdf">
+      <template>
+        <pageTemplate id="main">
+          <frame id="first" x1="1cm" y1="1cm" width="19cm" height="26cm"/>
+        </pageTemplate>
+      </template>
+      <story>
+        <barCodeFlowable code="QR" value="https://example.com/verify/1" />
+        <barCodeFlowable code="QR" value="https://example.com/verify/1" />
+      </story>
+    </document>"""
+
+    def _getPictures(self):
+        package = zipfile.ZipFile(rml2odt.convertString(self.rml))
+        content = package.read('content.xml').decode()
+        return package, content, [
+            package.read(name) for name in package.namelist()
+            if name.startswith('Pictures/')]
+
+    def test_renderQRCode_cached(self):
+        flowable.renderQRCode.cache_clear()
+        package, content, pictures = self._getPictures()
+        self.assertEqual(len(pictures), 1)
+        info = flowable.renderQRCode.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+
+    def test_minimalScale(self):
+        package, content, pictures = self._getPictures()
+        self.assertNotIn('svg:width', content)
+
+        self.rml = self.rml.replace(
+            '<barCodeFlowable ', '<barCodeFlowable minimalScale="true" ')
+        package, content, minimal = self._getPictures()
+        self.assertLess(len(minimal[0]), len(pictures[0]))
+        # Version 4 code, 33 modules and 2 * 4 quiet zone ones, at 5
+        # pixels each and 96 DPI.
+        self.assertIn('svg:width="153.75pt"', content)
+        self.assertIn('svg:height="153.75pt"', content)
+
+
 class ElementMock(dict):
     pass
 
@@ -70,6 +229,9 @@ class ElementMock(dict):
 def test_suite():
     suite = unittest.TestSuite((
         unittest.makeSuite(ParagraphTests),
+        unittest.makeSuite(FlowableStylesTests),
+        unittest.makeSuite(ImageCacheTests),
+        unittest.makeSuite(BarCodeFlowableTests),
     ))
 
     return suite
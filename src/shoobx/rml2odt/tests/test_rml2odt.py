@@ -14,143 +14,35 @@
 """RML to DOCX Converter Tests
 """
 
+import collections
+import contextlib
 import glob
+import io
 import os
+import shutil
 import subprocess
 import sys
+import tempfile
 import unittest
 import zipfile
 
+import lxml.etree
+import odf.style
+import odf.text
+from odf.namespaces import DRAWNS, FONS, OFFICENS, STYLENS, TEXTNS
+from odf.opendocument import OpenDocumentText
 from PIL import Image
 from zope.interface import verify
 
-from shoobx.rml2odt import interfaces, rml2odt
-
-INPUT_DIR = os.path.join(os.path.dirname(__file__), "test_data", "input")
-OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "test_data", "output")
-EXPECT_DIR = os.path.join(os.path.dirname(__file__), "test_data", "expected")
-
-Z3C_RML_INPUT_DIR = os.path.join(os.path.dirname(__file__), "z3c_rml_tests", "input")
-Z3C_RML_OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "z3c_rml_tests", "output")
-Z3C_RML_EXPECT_DIR = os.path.join(
-    os.path.dirname(__file__), "z3c_rml_tests", "expected"
-)
-
-Z3C_RML_BLACKLIST = (
-    "printScaling.rml",
-    "rml-examples-000-simple.rml",
-    "rml-examples-001-cmbox.rml",
-    "rml-examples-003-frames.rml",
-    "rml-examples-004-fpt-templates.rml",
-    "rml-examples-004-templates.rml",
-    "rml-examples-005-fonts.rml",
-    "rml-examples-006-barcodes.rml",
-    "rml-examples-009-splitting.rml",
-    "rml-examples-010-linkURL.rml",
-    "rml-examples-017-outlines.rml",
-    "rml-examples-029-keepinframe.rml",
-    "rml-examples-032-images.rml",
-    "rml-examples-034-cmyk.rml",
-    "rml-examples-035-numbering.rml",
-    "rml-examples-036-numbering-contd.rml",
-    "rml-examples-037-plugingraphic.rml",
-    "rml-examples-038-rect-href.rml",
-    "rml-examples-039-doc-programming.rml",
-    "rml-examples-041-masking.rml",
-    "rml-examples-042-longdoc.rml",
-    "rml-examples-044-codesnippets.rml",
-    "rml-examples-045-cmyk.rml",
-    "rml-examples-047-condPageBreak.rml",
-    "rml-examples-048-paragraph-flow-controls.rml",
-    "rml-guide-example-01.rml",
-    "rml-guide-example-02.rml",
-    "rml-guide-example-03.rml",
-    "rml-guide-example-04.rml",
-    "rml-guide-example-05.rml",
-    "rml-guide-example-06.rml",
-    "rml-guide-example-07.rml",
-    "rml-guide-example-08.rml",
-    "rml-guide-example-09.rml",
-    "rml-guide-example-10.rml",
-    "rml-guide-example-11.rml",
-    "rml-guide-example-12.rml",
-    "special-text.rml",
-    "symbols-set.rml",
-    "tag-alias.rml",
-    "tag-barChart.rml",
-    "tag-barChart3d.rml",
-    "tag-barcode.rml",
-    "tag-buttonField.rml",
-    "tag-circle.rml",
-    "tag-codesnippet.rml",
-    "tag-color.rml",
-    "tag-condPageBreak.rml",
-    "tag-cropMarks.rml",
-    "tag-curves.rml",
-    "tag-doc.rml",
-    "tag-document-pageDrawing.rml",
-    "tag-drawAlignedString.rml",
-    "tag-drawString.rml",
-    "tag-drawRightString.rml",
-    "tag-drawCenteredString.rml",
-    "tag-ellipse.rml",
-    "tag-fill.rml",
-    "tag-fixedSize.rml",
-    "tag-grid.rml",
-    "tag-illustration.rml",
-    "tag-image.rml",
-    "tag-image-1.rml",
-    "tag-image-data-uri.rml",
-    "tag-image-mask.rml",
-    "tag-image-svg.rml",
-    "tag-imageAndFlowables.rml",
-    "tag-imageAndFlowables-svg.rml",
-    "tag-includePdfPages.rml",
-    "tag-indent.rml",
-    "tag-index.rml",
-    "tag-keepInFrame.rml",
-    "tag-keepTogether.rml",
-    "tag-lines.rml",
-    "tag-lineMode.rml",
-    "tag-linePlot.rml",
-    "tag-linePlot3D.rml",
-    "tag-log.rml",
-    "tag-mergePage.rml",
-    "tag-name.rml",
-    "tag-nextFrame.rml",
-    "tag-outlineAdd.rml",
-    "tag-pageGraphics.rml",
-    "tag-pageInfo.rml",
-    "tag-pageInfo-2.rml",
-    "tag-pageNumber.rml",
-    "tag-para-wordWrap.rml",
-    "tag-path.rml",
-    "tag-pieChart.rml",
-    "tag-pieChart3d.rml",
-    "tag-place.rml",
-    "tag-plugInFlowable.rml",
-    "tag-plugInGraphic.rml",
-    "tag-pto.rml",
-    "tag-rectange.rml",
-    "tag-registerCidFont.rml",
-    "tag-registerTTFont.rml",
-    "tag-registerType1Face.rml",
-    "tag-rotate.rml",
-    "tag-saveState-restoreState.rml",
-    "tag-scale.rml",
-    "tag-selectField.rml",
-    "tag-setFont.rml",
-    "tag-setFontSize.rml",
-    "tag-setNextFrame.rml",
-    "tag-setNextTemplate.rml",
-    "tag-skew.rml",
-    "tag-spiderChart.rml",
-    "tag-storyPlace.rml",
-    "tag-stroke.rml",
-    "tag-textAnnotation.rml",
-    "tag-textField.rml",
-    "tag-transform.rml",
-    "tag-translate.rml",
+from shoobx.rml2odt import document, interfaces, rml2odt, writer
+from shoobx.rml2odt.tests.corpus import (
+    EXPECT_DIR,
+    INPUT_DIR,
+    OUTPUT_DIR,
+    Z3C_RML_BLACKLIST,
+    Z3C_RML_EXPECT_DIR,
+    Z3C_RML_INPUT_DIR,
+    Z3C_RML_OUTPUT_DIR,
 )
 
 LOG_FILE = os.path.join(os.path.dirname(__file__), "render.log")
@@ -226,6 +118,418 @@ class Rml2OdtConverterTest(unittest.TestCase):
         # succeeded.
         self.assertEqual(result.getvalue()[:2], b"PK")
 
+    def test_convertToStream_unseekable(self):
+        class Pipe(object):
+            # Only write(), like a pipe or a socket.
+            def __init__(self):
+                self.chunks = []
+
+            def write(self, data):
+                self.chunks.append(bytes(data))
+
+        path = os.path.join(INPUT_DIR, "tag-image.rml")
+        with open(path, "rb") as rmlfile:
+            rml = rmlfile.read()
+        pipe = Pipe()
+        rml2odt.convertToStream(rml, pipe, filename=path)
+        data = b"".join(pipe.chunks)
+
+        package = zipfile.ZipFile(io.BytesIO(data))
+        other = zipfile.ZipFile(
+            io.BytesIO(rml2odt.convertToBytes(rml, filename=path)))
+        self.assertEqual(package.namelist(), other.namelist())
+        self.assertEqual(package.read("content.xml"),
+                         other.read("content.xml"))
+        self.assertIsNone(package.testzip())
+        self.assertEqual(package.namelist()[0], "mimetype")
+        self.assertEqual(package.infolist()[0].compress_type,
+                         zipfile.ZIP_STORED)
+        # The mimetype can be sniffed at the fixed offset.
+        self.assertEqual(
+            data[30:77], b"mimetypeapplication/vnd.oasis.opendocument.text")
+        self.assertIn("META-INF/manifest.xml", package.namelist())
+        self.assertIn(b"<office:body>", package.read("content.xml"))
+
+    def test_convertString_flat(self):
+        path = os.path.join(INPUT_DIR, "tag-image.rml")
+        with open(path, "rb") as rmlfile:
+            rml = rmlfile.read()
+        packaged = zipfile.ZipFile(
+            rml2odt.convertString(rml, filename=path))
+        flat = rml2odt.convertString(rml, filename=path, format="fodt")
+
+        root = lxml.etree.parse(flat).getroot()
+        nsmap = {"office": OFFICENS, "draw": DRAWNS}
+        self.assertEqual(root.tag, "{%s}document" % OFFICENS)
+        self.assertEqual(
+            root.get("{%s}mimetype" % OFFICENS),
+            "application/vnd.oasis.opendocument.text")
+        self.assertEqual(
+            [child.tag.split("}")[1] for child in root],
+            ["meta", "font-face-decls", "styles", "automatic-styles",
+             "master-styles", "body"])
+        # The pictures of the package are inlined.
+        content = lxml.etree.fromstring(packaged.read("content.xml"))
+        self.assertEqual(
+            len(root.findall(".//draw:image/office:binary-data", nsmap)),
+            len(content.findall(".//draw:image", nsmap)))
+        self.assertNotIn(b"Pictures/", flat.getvalue())
+
+    def test_convertString_pictures(self):
+        path = os.path.join(INPUT_DIR, "tag-image.rml")
+        with open(path, "rb") as rmlfile:
+            rml = rmlfile.read()
+        package = zipfile.ZipFile(rml2odt.convertString(rml, filename=path))
+        pictures = [info for info in package.infolist()
+                    if info.filename.startswith("Pictures/")]
+        content = lxml.etree.fromstring(package.read("content.xml"))
+        hrefs = [image.get("{http://www.w3.org/1999/xlink}href")
+                 for image in content.iter("{%s}image" % DRAWNS)]
+        # shoobx.png is used many times, but stored once.
+        self.assertEqual(len(hrefs), 15)
+        self.assertEqual(
+            sorted(set(hrefs)), sorted(info.filename for info in pictures))
+        self.assertNotIn(b"binary-data", package.read("content.xml"))
+        for info in pictures:
+            self.assertEqual(info.compress_type, zipfile.ZIP_STORED)
+        manifest = package.read("META-INF/manifest.xml")
+        self.assertIn(b'manifest:media-type="image/gif"', manifest)
+
+    def test_serializers(self):
+        path = os.path.join(INPUT_DIR, "tag-blockTableStyle-span.rml")
+        with open(path, "rb") as rmlfile:
+            root = lxml.etree.parse(rmlfile).getroot()
+        doc = document.Document(root)
+        doc.process(io.BytesIO())
+
+        parts = {}
+        for serializer in writer.SERIALIZERS:
+            output = io.BytesIO()
+            writer.writeDocument(doc.document, output, serializer)
+            package = zipfile.ZipFile(output)
+            parts[serializer] = [
+                lxml.etree.tostring(
+                    lxml.etree.fromstring(package.read(name)),
+                    method="c14n")
+                for name in ("content.xml", "styles.xml")]
+        self.assertEqual(parts["lxml"], parts["odfpy"])
+
+    def test_serializer_option(self):
+        path = os.path.join(INPUT_DIR, "hello-world.rml")
+        used = []
+        lxmlSerializer = writer.SERIALIZERS["lxml"]
+
+        def serializer(*args):
+            used.append(args)
+            return lxmlSerializer(*args)
+
+        writer.SERIALIZERS["lxml"] = serializer
+        try:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                self.assertEqual(rml2odt.main(
+                    ["--serializer", "lxml", "-q", path,
+                     "-o", os.path.join(tmpdir, "out.odt")]), 0)
+            self.assertTrue(used)
+            # The option does not change the default of the process.
+            self.assertEqual(document.Document.serializer, "odfpy")
+            del used[:]
+            rml2odt.convertFile(path, os.path.join(OUTPUT_DIR, "hello-world.odt"))
+            self.assertEqual(used, [])
+        finally:
+            writer.SERIALIZERS["lxml"] = lxmlSerializer
+
+    def test_convertString_stats(self):
+        path = os.path.join(INPUT_DIR, "tag-image.rml")
+        with open(path, "rb") as rmlfile:
+            rml = rmlfile.read()
+        output, stats = rml2odt.convertString(rml, filename=path, stats=True)
+        data = output.getvalue()
+        self.assertEqual(stats.size, len(data))
+
+        package = zipfile.ZipFile(output)
+        self.assertEqual(
+            stats.parts,
+            {info.filename: info.file_size for info in package.infolist()})
+        content = lxml.etree.fromstring(package.read("content.xml"))
+        self.assertEqual(
+            stats.elements["draw:image"],
+            len(content.findall(".//{%s}image" % DRAWNS)))
+        self.assertEqual(
+            stats.automaticStyles,
+            sum(stats.elements.get(name, 0) for name in (
+                "style:style", "text:list-style", "style:page-layout")))
+        self.assertIn("ImageFrame", stats.styleNames)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            outputfile = os.path.join(tmpdir, "tag-image.fodt")
+            stats = rml2odt.convertFile(path, outputfile, stats=True)
+            self.assertEqual(stats.size, os.path.getsize(outputfile))
+            self.assertEqual(stats.parts, {})
+            self.assertIsNone(rml2odt.convertFile(path, outputfile))
+
+        # Elements attached to the document in any way are counted.
+        path = os.path.join(INPUT_DIR, "tag-blockTable-list.rml")
+        with open(path, "rb") as rmlfile:
+            rml = rmlfile.read()
+        output, stats = rml2odt.convertString(rml, filename=path, stats=True)
+        package = zipfile.ZipFile(output)
+        counts = collections.Counter(
+            lxml.etree.QName(element).localname
+            for name in ("content.xml", "styles.xml")
+            for element in lxml.etree.fromstring(package.read(name)).iter(
+                "{%s}*" % TEXTNS))
+        for name in ("p", "list", "list-item", "tab"):
+            self.assertEqual(stats.elements["text:" + name], counts[name])
+        self.assertEqual(stats.elements["text:tab"], 15)
+
+    def test_shareListStyles(self):
+        rml = """<document filename="lists.pdf">
+  <template>
+    <pageTemplate id="main">
+      <frame id="first" x1="1cm" y1="1cm" width="19cm" height="26cm"/>
+    </pageTemplate>
+  </template>
+  <story>
+    <ol><li>One</li></ol>
+    <ol><li>Two</li><li><ol><li>Nested</li></ol></li></ol>
+    <ol><li>Three</li><li><ol bulletType="A"><li>Letters</li></ol></li></ol>
+    <ul><li>Four</li></ul>
+  </story>
+</document>"""
+
+        def getListStyles(data):
+            content = lxml.etree.fromstring(
+                zipfile.ZipFile(io.BytesIO(data)).read("content.xml"))
+            styles = {
+                style.get("{%s}name" % STYLENS): style
+                for style in content.iter("{%s}list-style" % TEXTNS)}
+            return [styles[lst.get("{%s}style-name" % TEXTNS)]
+                    for lst in content.find(".//{%s}text" % OFFICENS)
+                    if lst.tag == "{%s}list" % TEXTNS]
+
+        first, second, third, fourth = getListStyles(
+            rml2odt.convertToBytes(rml))
+        # The first two lists share a style with the levels they use.
+        self.assertIs(first, second)
+        self.assertEqual(len(first), 2)
+        # The third list changes its second level, so it gets a copy.
+        self.assertIsNot(third, first)
+        self.assertNotEqual(
+            lxml.etree.tostring(third[1]), lxml.etree.tostring(first[1]))
+        self.assertEqual(
+            lxml.etree.tostring(third[0]), lxml.etree.tostring(first[0]))
+        self.assertEqual(third[1].get("{%s}num-format" % STYLENS), "A")
+        self.assertEqual(fourth[0].tag, "{%s}list-level-style-bullet" % TEXTNS)
+
+        styles = getListStyles(
+            rml2odt.convertToBytes(rml, shareListStyles=False))
+        self.assertEqual(len(set(styles)), 4)
+        self.assertEqual([len(style) for style in styles], [10] * 4)
+        self.assertTrue(document.Document.shareListStyles)
+
+        result, = rml2odt.convertMany([rml], processes=1,
+                                      shareListStyles=False)
+        self.assertEqual(len(set(getListStyles(result.output))), 4)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "lists.rml")
+            with open(path, "w") as rmlfile:
+                rmlfile.write(rml)
+            self.assertEqual(rml2odt.main(
+                ["--no-share-list-styles", "-q", path]), 0)
+            with open(os.path.join(tmpdir, "lists.odt"), "rb") as odtfile:
+                self.assertEqual(len(set(getListStyles(odtfile.read()))), 4)
+
+    def test_profile(self):
+        path = os.path.join(INPUT_DIR, "tag-blockTableStyle-span.rml")
+        with open(path, "rb") as rmlfile:
+            root = lxml.etree.parse(rmlfile).getroot()
+        doc = document.Document(root)
+        doc.process(io.BytesIO())
+        self.assertIsNone(doc.profiler)
+
+        doc = document.Document(root)
+        doc.profile = True
+        doc.process(io.BytesIO())
+        stats = doc.profiler.stats
+        self.assertEqual(stats["blockTable"].calls, 1)
+        self.assertEqual(
+            stats["tr"].calls, len(root.findall(".//blockTable/tr")))
+        self.assertEqual(
+            stats["td"].calls, len(root.findall(".//blockTable/tr/td")))
+        # Tags below the story, including tags dispatched by z3c.rml's
+        # directives, are recorded.
+        self.assertIn("blockSpan", stats)
+        self.assertLessEqual(
+            stats["blockTable"].exclusive, stats["blockTable"].inclusive)
+        self.assertGreaterEqual(
+            stats["blockTable"].inclusive, stats["tr"].inclusive)
+        self.assertTrue(all(tag.nodes >= 0 for tag in stats.values()))
+        self.assertGreater(stats["para"].nodes, 0)
+        self.assertIn("blockTable", doc.profiler.report())
+
+        # Every element added by a directive is credited to one, including
+        # the lists replacing tables in lists.
+        path = os.path.join(INPUT_DIR, "tag-blockTable-list.rml")
+        with open(path, "rb") as rmlfile:
+            doc = document.Document(lxml.etree.parse(rmlfile).getroot())
+        doc.profile = True
+        doc.process(io.BytesIO())
+        defaults = document.Document(None)
+        defaults.document = OpenDocumentText()
+        defaults.registerDefaultStyles()
+        # Writing moves the meta element out of the tree.
+        writer.writeDocument(defaults.document, io.BytesIO())
+        self.assertEqual(
+            sum(tag.nodes for tag in doc.profiler.stats.values()),
+            sum(document.countElements(doc.document.topnode).values()) -
+            sum(document.countElements(defaults.document.topnode).values()))
+
+    def test_convertMany(self):
+        path = os.path.join(INPUT_DIR, "hello-world.rml")
+        with open(path, "rb") as rmlfile:
+            rml = rmlfile.read()
+        inputs = [rml, "<document><broken></document>", path]
+
+        for processes in (1, 2):
+            results = list(rml2odt.convertMany(inputs, processes=processes))
+            self.assertEqual([r.index for r in results], [0, 1, 2])
+            self.assertEqual(results[0].output[:2], b"PK")
+            self.assertIsNone(results[0].error)
+            self.assertIsNone(results[1].output)
+            self.assertIsInstance(results[1].error, Exception)
+            self.assertEqual(results[2].output[:2], b"PK")
+
+    def test_convertMany_unordered(self):
+        path = os.path.join(INPUT_DIR, "hello-world.rml")
+        outputPath = os.path.join(OUTPUT_DIR, "hello-world-many.odt")
+        results = list(rml2odt.convertMany(
+            [path, (path, outputPath)], processes=2, maxtasksperchild=1,
+            ordered=False))
+        results.sort()
+        self.assertEqual(results[1].output, outputPath)
+        with open(outputPath, "rb") as odtfile:
+            self.assertEqual(odtfile.read(2), b"PK")
+
+
+    def test_main(self):
+        path = os.path.join(INPUT_DIR, "hello-world.rml")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = os.path.join(tmpdir, "single.odt")
+            self.assertEqual(rml2odt.main([path, output]), 0)
+            self.assertTrue(os.path.exists(output))
+
+            output = os.path.join(tmpdir, "single.fodt")
+            self.assertEqual(rml2odt.main([path, "-o", output]), 0)
+            with open(output, "rb") as fodtfile:
+                self.assertEqual(fodtfile.read(5), b"<?xml")
+
+            flatdir = os.path.join(tmpdir, "flat")
+            self.assertEqual(
+                rml2odt.main(["-f", "fodt", "-q", path, "-d", flatdir]), 0)
+            with open(os.path.join(flatdir, "hello-world.fodt"), "rb") as f:
+                self.assertEqual(f.read(5), b"<?xml")
+            # The option does not change the default of the process.
+            self.assertEqual(document.Document.format, "odt")
+
+            manifest = os.path.join(tmpdir, "manifest.jsonl")
+            with open(manifest, "w") as mfile:
+                mfile.write('{"input": "%s"}\n' % path)
+                mfile.write('{"input": "missing.rml"}\n')
+            outdir = os.path.join(tmpdir, "out")
+            result = rml2odt.main(
+                [os.path.join(INPUT_DIR, "tag-b*.rml"), manifest,
+                 "-d", outdir, "-j", "2", "-q"])
+            self.assertEqual(result, 1)
+            self.assertIn("hello-world.odt", os.listdir(outdir))
+            self.assertIn("tag-br.odt", os.listdir(outdir))
+
+            # A second input is not mistaken for the output file.
+            first = os.path.join(tmpdir, "first.rml")
+            second = os.path.join(tmpdir, "SECOND.RML")
+            shutil.copy(path, first)
+            shutil.copy(path, second)
+            with open(manifest, "w") as mfile:
+                mfile.write('{"input": "%s"}\n' % second)
+            self.assertEqual(rml2odt.main([first, manifest, "-q"]), 0)
+            with open(manifest) as mfile:
+                self.assertEqual(mfile.read(), '{"input": "%s"}\n' % second)
+            self.assertTrue(os.path.exists(os.path.join(tmpdir, "first.odt")))
+            self.assertTrue(os.path.exists(os.path.join(tmpdir, "SECOND.odt")))
+
+            os.remove(os.path.join(tmpdir, "SECOND.odt"))
+            self.assertEqual(rml2odt.main([first, second, "-q"]), 0)
+            self.assertTrue(os.path.exists(os.path.join(tmpdir, "SECOND.odt")))
+            with open(second, "rb") as rmlfile:
+                self.assertNotEqual(rmlfile.read(2), b"PK")
+
+            with self.assertRaises(SystemExit), \
+                    contextlib.redirect_stderr(io.StringIO()):
+                rml2odt.main([first, os.path.join(tmpdir, "out.pdf")])
+
+
+class DefaultStylesTest(unittest.TestCase):
+    def _makeDocument(self):
+        doc = document.Document(None)
+        doc.document = OpenDocumentText()
+        doc.registerDefaultStyles()
+        return doc
+
+    def test_registerDefaultStyles(self):
+        first = self._makeDocument()
+        second = self._makeDocument()
+
+        normal = first.document.getStyleByName('Normal')
+        self.assertIs(first.odtStyles['Normal'], normal)
+        self.assertEqual(first.fontFaces, {'Arial', 'Courier'})
+        # Every document gets its own copy of the default styles.
+        self.assertIsNot(second.odtStyles['Normal'], normal)
+        self.assertEqual(
+            normal.childNodes[0].attributes,
+            second.odtStyles['Normal'].childNodes[0].attributes)
+        self.assertEqual(
+            len(first.document.automaticstyles.childNodes),
+            len(second.document.automaticstyles.childNodes))
+
+    def test_getStyle(self):
+        doc = self._makeDocument()
+        self.assertIs(doc.getStyle('Normal'), doc.odtStyles['Normal'])
+        self.assertIsNone(doc.getStyle('Unknown'))
+        for style in doc.document.automaticstyles.childNodes:
+            self.assertIs(doc.getStyle(style.getAttribute('name')), style)
+
+        name = doc.internStyleElement(
+            'Span', odf.style.Style, odf.style.TextProperties(color='#ff0000'),
+            family='text')
+        self.assertEqual(doc.getStyle(name).getAttribute('family'), 'text')
+
+        style = odf.text.ListStyle(name='My List-ul')
+        doc.addStyle(style)
+        self.assertIs(doc.getStyle('My List-ul'), style)
+
+        doc.removeStyle(style)
+        self.assertIsNone(doc.getStyle('My List-ul'))
+        self.assertNotIn(style, doc.document.automaticstyles.childNodes)
+
+    def test_redefineNormal(self):
+        rml = """<document filename="normal.pdf">
+          <template>
+            <pageTemplate id="main">
+              <frame id="first" x1="1cm" y1="1cm" width="19cm" height="26cm"/>
+            </pageTemplate>
+          </template>
+          <stylesheet>
+            <paraStyle name="Normal" parent="Normal" fontSize="12pt"/>
+          </stylesheet>
+          <story><para>Hello</para></story>
+        </document>"""
+        package = zipfile.ZipFile(rml2odt.convertString(rml))
+        content = lxml.etree.fromstring(package.read("content.xml"))
+        normal = content.find(
+            './/{%s}style[@{%s}name="Normal"]' % (STYLENS, STYLENS))
+        props = normal.find("{%s}paragraph-properties" % STYLENS)
+        # The redefined style does not inherit from the replaced one.
+        self.assertEqual(props.get("{%s}padding" % FONS), "0pt")
+
 
 class Rml2OdtConverterFileTest(unittest.TestCase):
     def __init__(self, inputPath, outputPath, expectPath):
@@ -400,7 +704,10 @@ def addTests(suite, prefix, inputDir, expectedDir, outputDir, blackList):
 
 
 def test_suite():
-    suite = unittest.TestSuite((unittest.makeSuite(Rml2OdtConverterTest),))
+    suite = unittest.TestSuite((
+        unittest.makeSuite(Rml2OdtConverterTest),
+        unittest.makeSuite(DefaultStylesTest),
+    ))
 
     addTests(suite, "rml2odt", INPUT_DIR, EXPECT_DIR, OUTPUT_DIR, ())
     addTests(
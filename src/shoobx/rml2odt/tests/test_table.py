@@ -14,12 +14,17 @@
 """RML to DOCX Converter Tests
 """
 
+import io
+import os
+import tempfile
 import unittest
+import zipfile
 
 import lxml
+from odf.namespaces import STYLENS, TABLENS, TEXTNS
 from odf.opendocument import OpenDocumentText
 
-from shoobx.rml2odt import document, stylesheet, table
+from shoobx.rml2odt import document, rml2odt, stylesheet, table
 
 STYLE1 = """
     <blockTableStyle id="table">
@@ -85,9 +90,91 @@ EXPECTED3 = """
 | cell | cell | cell | cell |      |
 """
 
+BULKDATA = """<document filename="bulkData.pdf">
+  <template>
+    <pageTemplate id="main">
+      <frame id="first" x1="1cm" y1="1cm" width="19cm" height="26cm"/>
+    </pageTemplate>
+  </template>
+  <stylesheet>
+    <blockTableStyle id="table">
+      <blockFont name="Helvetica-Bold" start="0,0" stop="-1,0"/>
+      <blockSpan start="0,2" stop="1,2"/>
+    </blockTableStyle>
+  </stylesheet>
+  <story>
+    <blockTable style="table">
+      <tr><td>Product</td><td>Price</td></tr>
+      <bulkData><![CDATA[
+Sprockets, "1,026"
+Widgets and  gadgets,
+
+Total, 1,060
+      ]]></bulkData>
+    </blockTable>
+  </story>
+</document>"""
+
+STREAMED = """<document filename="streamed.pdf">
+  <template>
+    <pageTemplate id="main">
+      <frame id="first" x1="1cm" y1="1cm" width="19cm" height="26cm"/>
+    </pageTemplate>
+  </template>
+  <story>
+    <blockTable>
+      <tr><td>Account</td><td>Amount</td></tr>
+      <bulkData %s/>
+    </blockTable>
+  </story>
+</document>"""
+
+
+def getCells(data):
+    content = lxml.etree.fromstring(
+        zipfile.ZipFile(io.BytesIO(data)).read('content.xml'))
+    return [[''.join(cell.itertext()) for cell in row]
+            for row in content.iter('{%s}table-row' % TABLENS)]
+
 
 class BlockTableTests(unittest.TestCase):
 
+    def test_parseBulkData(self):
+        self.assertEqual(
+            table.parseBulkData(
+                '\n  Product, Price\n\n  "Bits, Bobs", 23 \n, \n'),
+            [['Product', 'Price'], ['Bits, Bobs', '23'], ['', '']])
+        self.assertEqual(
+            table.parseBulkData('\n  "Bits,\n  Bobs", 23\r\n  Nuts, 5\n'),
+            [['Bits,\n  Bobs', '23'], ['Nuts', '5']])
+        self.assertEqual(table.parseBulkData(None), [])
+
+    def test_bulkData(self):
+        content = lxml.etree.fromstring(zipfile.ZipFile(io.BytesIO(
+            rml2odt.convertToBytes(BULKDATA))).read('content.xml'))
+        rows = content.findall('.//{%s}table-row' % TABLENS)
+        cells = [
+            [(cell.tag.split('}')[1],
+              ''.join(cell.itertext()),
+              cell.get('{%s}number-columns-spanned' % TABLENS))
+             for cell in row]
+            for row in rows]
+        self.assertEqual(cells, [
+            [('table-cell', 'Product', None), ('table-cell', 'Price', None)],
+            [('table-cell', 'Sprockets', None),
+             ('table-cell', '1,026', None)],
+            [('table-cell', 'Widgets and gadgets', '2'),
+             ('covered-table-cell', '', None)],
+            [('table-cell', 'Total', None), ('table-cell', '1', None),
+             ('table-cell', '060', None)],
+        ])
+        # The table style applies to the bulk data like to other rows.
+        header = rows[0][0].find('{%s}p' % TEXTNS)
+        first = rows[1][0].find('{%s}p' % TEXTNS)
+        self.assertNotEqual(
+            header.get('{%s}style-name' % TEXTNS),
+            first.get('{%s}style-name' % TEXTNS))
+
     def test_getSpanMap_1(self):
         tbl = self._getTable(STYLE1)
         tbl.rows = 9
@@ -118,6 +205,206 @@ class BlockTableTests(unittest.TestCase):
 
         self.assertEqual(out, EXPECTED3.strip())
 
+    def test_getSpanMap_overlap(self):
+        tbl = self._getTable("""
+            <blockTableStyle id="table">
+              <blockSpan start="0,0" stop="1,1"/>
+              <blockSpan start="1,1" stop="2,2"/>
+            </blockTableStyle>""")
+        tbl.rows = 4
+        tbl.columns = 5
+        with self.assertRaises(ValueError) as cm:
+            tbl.getSpanMap()
+        self.assertEqual(
+            str(cm.exception),
+            'Span (1, 1, 2, 2) overlaps span (0, 0, 1, 1). '
+            '(file <unknown>, line 4)')
+
+    def test_getSpanMap_sparse(self):
+        tbl = self._getTable(STYLE3)
+        tbl.rows = 4
+        tbl.columns = 5
+        res = tbl.getSpanMap()
+        # 1x1 spans are regular cells
+        self.assertEqual(res.spans, [(0, 0, 1, 0), (2, 1, 2, 2), (4, 2, 4, 3)])
+        self.assertEqual(sorted(res.byRow), [0, 1, 2, 3])
+
+        tbl = self._getTable('<blockTableStyle id="table"/>')
+        tbl.rows = 4
+        tbl.columns = 5
+        res = tbl.getSpanMap()
+        self.assertEqual(res.byRow, {})
+        self.assertIsNone(res.get(0, 0))
+
+    def test_getStyleMap_sharesStyles(self):
+        tbl = self._getTable(STYLE2)
+        tbl.rows = 4
+        tbl.columns = 5
+        tbl.spanMap = tbl.getSpanMap()
+        res = tbl.getStyleMap()
+        # covered cells are not displayed, their styles are never used
+        cells = [res.getCell(col, row)
+                 for col in range(5) for row in range(4)
+                 if (tbl.spanMap.get(col, row) or {}).get('type') != 'H']
+
+        cellStyles = {cell['cellStyleName'] for cell in cells}
+        contentStyles = {cell['cellContentStyleName'] for cell in cells}
+        automaticStyles = [
+            style.getAttribute('name')
+            for style in tbl.parent.document.automaticstyles.childNodes]
+
+        # 14 displayed cells, but only a handful of different looks
+        self.assertEqual(len(cellStyles), 5)
+        self.assertEqual(len(contentStyles), 1)
+        self.assertEqual(
+            sorted(automaticStyles), sorted(cellStyles | contentStyles))
+
+    def test_bulkData_source(self):
+        def ledger():
+            yield ('Cash', 100)
+            yield ('Bank, main', None)
+            yield ['Fees', 2.5, 'extra']
+
+        rows = table.RowSource(ledger(), count=3, columns=3)
+        # Known dimensions, the rows are consumed while they are added.
+        self.assertIsInstance(rows.rows, type(ledger()))
+        data = rml2odt.convertToBytes(
+            STREAMED % 'source="ledger"', rowSources={'ledger': rows})
+        expected = [
+            ['Account', 'Amount'],
+            ['Cash', '100'],
+            ['Bank, main', ''],
+            ['Fees', '2.5', 'extra'],
+        ]
+        self.assertEqual(getCells(data), expected)
+
+        # Other iterables are measured first.
+        data = rml2odt.convertToBytes(
+            STREAMED % 'source="ledger"', rowSources={'ledger': ledger()})
+        self.assertEqual(getCells(data), expected)
+
+        with self.assertRaises(ValueError) as cm:
+            rml2odt.convertToBytes(STREAMED % 'source="missing"')
+        self.assertIn("Unknown row source 'missing'", str(cm.exception))
+
+    def test_bulkData_source_size(self):
+        # Rows beyond the declared size are not silently misstyled.
+        rows = table.RowSource([['a', 'b'], ['c', 'd', 'e']], count=2,
+                               columns=2)
+        with self.assertRaises(ValueError) as cm:
+            rml2odt.convertToBytes(
+                STREAMED % 'source="ledger"', rowSources={'ledger': rows})
+        self.assertEqual(
+            str(cm.exception),
+            "Row 1 of row source 'ledger' has more than 2 columns. "
+            "(file <unknown>, line 10)")
+
+        rows = table.RowSource([['a'], ['b'], ['c']], count=2, columns=1)
+        with self.assertRaises(ValueError) as cm:
+            rml2odt.convertToBytes(
+                STREAMED % 'source="ledger"', rowSources={'ledger': rows})
+        self.assertEqual(
+            str(cm.exception),
+            "Row source 'ledger' has more than 2 rows. "
+            "(file <unknown>, line 10)")
+
+    def test_bulkData_src(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'ledger.csv')
+            with open(path, 'w') as data:
+                data.write('Cash,100\n\n"Bank, main", 20\n'
+                           '"Notes\r\nand coins",\t3\r\n')
+            data = rml2odt.convertToBytes(STREAMED % 'src="%s"' % path)
+        self.assertEqual(getCells(data), [
+            ['Account', 'Amount'], ['Cash', '100'], ['Bank, main', '20'],
+            ['Notes and coins', '3']])
+
+    def test_StyleGrid(self):
+        doc = document.Document(None)
+        doc.document = OpenDocumentText()
+        grid = table.StyleGrid(doc, 4, 5)
+        red = ((0, 'backgroundcolor', '#ff0000'),)
+        bold = ((2, 'fontweight', 'bold'),)
+        # every other row, the first cell left alone, clipped to the table
+        grid.fill(range(0, 4), range(0, 9, 2), red, skip=[(0, 0)])
+        grid.fill(range(-2, 2), range(0, 1), bold)
+        self.assertEqual(list(grid.ids), [
+            2, 3, 1, 1,
+            0, 0, 0, 0,
+            1, 1, 1, 1,
+            0, 0, 0, 0,
+            1, 1, 1, 1,
+        ])
+        self.assertEqual(grid.looks[3], (
+            (('verticalalign', 'bottom'), ('backgroundcolor', '#ff0000')),
+            (),
+            (('fontweight', 'bold'),)))
+        # equal looks, whatever order they were made in
+        grid.set(2, 2, bold)
+        self.assertEqual(grid.ids[2 * 4 + 2], 3)
+        # styles are made for the looks used only
+        self.assertIs(grid.getCell(1, 0), grid.getCell(2, 2))
+        self.assertIs(grid.getCell(0, 1), grid.getCell(3, 3))
+        self.assertEqual(
+            len(doc.document.automaticstyles.childNodes), 4)
+
+    def test_repeated(self):
+        rml = STREAMED.replace(
+            '<tr><td>Account</td><td>Amount</td></tr>',
+            '<tr><td>Account</td><td/><td/><td/></tr>' +
+            '<tr><td/><td/><td/><td/></tr>' * 3)
+        content = lxml.etree.fromstring(zipfile.ZipFile(io.BytesIO(
+            rml2odt.convertToBytes(
+                rml % 'source="data"',
+                rowSources={'data': [('', None, '', ''), ('x',)]})
+        )).read('content.xml'))
+
+        def repeated(element, what):
+            return int(element.get(
+                '{%s}number-%s-repeated' % (TABLENS, what), 1))
+
+        columns = content.findall('.//{%s}table-column' % TABLENS)
+        self.assertEqual([repeated(col, 'columns') for col in columns], [4])
+        rows = content.findall('.//{%s}table-row' % TABLENS)
+        self.assertEqual(
+            [(repeated(row, 'rows'),
+              [repeated(cell, 'columns') for cell in row])
+             for row in rows],
+            [(1, [1, 3]), (4, [4]), (1, [1])])
+
+    def test_context(self):
+        rml = STREAMED.replace(
+            '<blockTable>',
+            '<blockTable colWidths="3cm 2cm" rowHeights="20 30">')
+        calls = []
+        getAttributeValues = table.BlockTable.getAttributeValues
+
+        def counted(tbl, *args, **kw):
+            calls.append(kw)
+            return getAttributeValues(tbl, *args, **kw)
+
+        table.BlockTable.getAttributeValues = counted
+        try:
+            data = rml2odt.convertToBytes(
+                rml % 'source="data"',
+                rowSources={'data': [('a', 1), ('b', 2), ('c', 3)]})
+        finally:
+            table.BlockTable.getAttributeValues = getAttributeValues
+        # The attributes are parsed once, not per row.
+        self.assertEqual(calls, [{}])
+
+        content = lxml.etree.fromstring(
+            zipfile.ZipFile(io.BytesIO(data)).read('content.xml'))
+        heights = {
+            style.get('{%s}name' % STYLENS): prop.get(
+                '{%s}row-height' % STYLENS)
+            for style in content.iter('{%s}style' % STYLENS)
+            for prop in style.iter('{%s}table-row-properties' % STYLENS)}
+        rows = content.findall('.//{%s}table-row' % TABLENS)
+        self.assertEqual(
+            [heights[row.get('{%s}style-name' % TABLENS)] for row in rows],
+            ['20.0pt', '30.0pt', None, None])
+
     def _getTable(self, style):
         doc = document.Document(None)
         doc.document = OpenDocumentText()
@@ -135,7 +422,7 @@ class BlockTableTests(unittest.TestCase):
         for row in range(rows):
             out += '|'
             for col in range(cols):
-                spaninfo = res[col][row]
+                spaninfo = res.get(col, row)
 
                 if spaninfo is None:
                     # regular cell
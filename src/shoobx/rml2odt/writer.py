@@ -0,0 +1,538 @@
+##############################################################################
+#
+# Copyright (c) 2017 Shoobx, Inc.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Streaming ODF package writer
+
+odfpy's ``save()`` renders every part of the package into a string and
+hands it to ``zipfile``. The writer below serializes each part straight
+into a compressor and writes the package strictly sequentially, so it only
+needs a ``write()`` method on the output: pipes, sockets and response
+bodies work as well as files. ``writeFlatDocument()`` writes the same
+document as a single flat XML file (FODT) without any compression.
+
+The XML itself can be produced by one of two serializers: ``odfpy`` uses
+the ``toXml()`` methods of the odfpy nodes, ``lxml`` copies the nodes into
+an lxml tree and lets libxml2 do the escaping and encoding.
+"""
+import base64
+import contextlib
+import struct
+import time
+import zlib
+
+import lxml.etree
+from odf import manifest
+from odf.draw import Image as DrawImage
+from odf.element import Element, Node, Text, _handle_unrepresentable
+from odf.namespaces import (
+    CHARTNS, DRAWNS, PRESENTATIONNS, STYLENS, TABLENS, TEXTNS, XLINKNS)
+from odf.office import (
+    AutomaticStyles, BinaryData, Document, DocumentContent, DocumentStyles)
+from odf.opendocument import IS_FILENAME, UNIXPERMS
+
+XMLPROLOGUE = "<?xml version='1.0' encoding='UTF-8'?>\n"
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+ZIP_VERSION = 20
+ZIP_MAX_SIZE = 0xFFFFFFFF
+# Bit 11 of the general purpose flags marks UTF-8 encoded member names.
+ZIP_FLAG_UTF8 = 0x800
+
+LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+CENTRAL_HEADER = struct.Struct('<4s6H3L5H2L')
+END_OF_CENTRAL_DIRECTORY = struct.Struct('<4s4H2LH')
+
+# Serialized text is collected up to this size before it is compressed.
+BUFFER_SIZE = 64 * 1024
+
+# Deflating these again does not gain anything, they are stored as is.
+COMPRESSED_MEDIATYPES = frozenset(('image/png', 'image/jpeg', 'image/gif'))
+
+
+class BufferedOutput(object):
+    """Collect written strings or bytes and pass them on in bigger blocks.
+
+    odfpy's ``toXml()`` writes many small strings, encoding and
+    compressing or writing them one by one would be slow.
+    """
+
+    def __init__(self):
+        self.buffer = []
+        self.buffered = 0
+        self.size = 0
+
+    def write(self, data):
+        self.buffer.append(data)
+        self.buffered += len(data)
+        if self.buffered >= BUFFER_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        if isinstance(self.buffer[0], str):
+            data = ''.join(self.buffer).encode('utf-8')
+        else:
+            data = b''.join(self.buffer)
+        self.buffer = []
+        self.buffered = 0
+        self.size += len(data)
+        self.writeBlock(data)
+
+    def writeBlock(self, data):
+        raise NotImplementedError
+
+
+class StreamOutput(BufferedOutput):
+    """Buffered output to a file-like object."""
+
+    def __init__(self, fileobj):
+        super().__init__()
+        self.fileobj = fileobj
+
+    def writeBlock(self, data):
+        self.fileobj.write(data)
+
+    def close(self):
+        self.flush()
+        if hasattr(self.fileobj, 'flush'):
+            self.fileobj.flush()
+
+
+class PackageMember(BufferedOutput):
+    """A member of the package that is being written.
+
+    The data is compressed as it comes in and only written to the package
+    once the member is closed, because the local header must contain the
+    sizes and the checksum of the data.
+    """
+
+    def __init__(self, writer, name, compress=True):
+        super().__init__()
+        self.writer = writer
+        self.name = name
+        self.method = ZIP_DEFLATED if compress else ZIP_STORED
+        self.compressor = zlib.compressobj(
+            zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15) \
+            if compress else None
+        self.chunks = []
+        self.crc = 0
+
+    def writeBlock(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+        if self.compressor is not None:
+            data = self.compressor.compress(data)
+        if data:
+            self.chunks.append(data)
+
+    def close(self):
+        self.flush()
+        if self.compressor is not None:
+            self.chunks.append(self.compressor.flush())
+            self.compressor = None
+        self.writer.addMember(self)
+        self.chunks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+
+class PackageWriter(object):
+    """Write a ZIP package sequentially to a file-like object."""
+
+    def __init__(self, fileobj, date_time=None):
+        self.fileobj = fileobj
+        self.offset = 0
+        self.entries = []
+        self.sizes = {}
+        year, month, day, hour, minute, second = \
+            (date_time or time.localtime())[:6]
+        self.dosDate = (year - 1980) << 9 | month << 5 | day
+        self.dosTime = hour << 11 | minute << 5 | second // 2
+
+    @property
+    def size(self):
+        return self.offset
+
+    def write(self, data):
+        self.fileobj.write(data)
+        self.offset += len(data)
+
+    def openMember(self, name, compress=True):
+        return PackageMember(self, name, compress)
+
+    def writeMember(self, name, data, compress=True):
+        with self.openMember(name, compress) as member:
+            member.write(data)
+
+    def addMember(self, member):
+        compressedSize = sum(len(chunk) for chunk in member.chunks)
+        if max(member.size, compressedSize, self.offset) > ZIP_MAX_SIZE:
+            raise ValueError(
+                'Package member %r is too large for a ZIP file without '
+                'ZIP64 extensions' % member.name)
+        name = member.name.encode('utf-8')
+        flags = 0 if name.isascii() else ZIP_FLAG_UTF8
+        self.entries.append(
+            (name, flags, member.method, member.crc, compressedSize,
+             member.size, self.offset))
+        self.sizes[member.name] = (member.size, compressedSize)
+        self.write(LOCAL_HEADER.pack(
+            b'PK\003\004', ZIP_VERSION, flags, member.method, self.dosTime,
+            self.dosDate, member.crc, compressedSize, member.size,
+            len(name), 0))
+        self.write(name)
+        for chunk in member.chunks:
+            self.write(chunk)
+
+    def close(self):
+        start = self.offset
+        for name, flags, method, crc, compressedSize, size, offset in \
+                self.entries:
+            # Version made by: 3 is Unix, so the permissions are kept.
+            self.write(CENTRAL_HEADER.pack(
+                b'PK\001\002', 3 << 8 | ZIP_VERSION, ZIP_VERSION, flags,
+                method, self.dosTime, self.dosDate, crc, compressedSize,
+                size, len(name), 0, 0, 0, 0, UNIXPERMS, offset))
+            self.write(name)
+        self.write(END_OF_CENTRAL_DIRECTORY.pack(
+            b'PK\005\006', 0, 0, len(self.entries), len(self.entries),
+            self.offset - start, start, 0))
+        if hasattr(self.fileobj, 'flush'):
+            self.fileobj.flush()
+
+
+XLINK_HREF = (XLINKNS, 'href')
+
+# The attributes that refer to automatic styles.
+STYLE_REFERENCES = frozenset((
+    (CHARTNS, 'style-name'),
+    (DRAWNS, 'style-name'),
+    (DRAWNS, 'text-style-name'),
+    (PRESENTATIONNS, 'style-name'),
+    (STYLENS, 'data-style-name'),
+    (STYLENS, 'list-style-name'),
+    (STYLENS, 'page-layout-name'),
+    (STYLENS, 'style-name'),
+    (TABLENS, 'default-cell-style-name'),
+    (TABLENS, 'style-name'),
+    (TEXTNS, 'style-name'),
+))
+
+
+def getUsedAutomaticStyles(odf, segments):
+    """The automatic styles referenced from within ``segments``.
+
+    Same as ``OpenDocument._used_auto_styles()``, which is quadratic in the
+    number of references, but in a single pass.
+    """
+    used = set()
+    stack = [node for top in segments for node in top.childNodes]
+    while stack:
+        node = stack.pop()
+        if node.nodeType != Node.ELEMENT_NODE:
+            continue
+        for name, value in node.attributes.items():
+            if name in STYLE_REFERENCES and value:
+                used.add(value)
+        stack.extend(node.childNodes)
+    return [style for style in odf.automaticstyles.childNodes
+            if isinstance(style, Element)
+            and style.attributes.get((STYLENS, 'name')) in used]
+
+
+class OdfpySerializer(object):
+    """Serialize with odfpy's own ``toXml()``."""
+
+    def __init__(self, out):
+        self.out = out
+
+    def start(self, node):
+        self.out.write(XMLPROLOGUE)
+        node.write_open_tag(0, self.out)
+
+    def end(self, node):
+        node.write_close_tag(0, self.out)
+
+    def write(self, node):
+        node.toXml(1, self.out)
+
+    def close(self):
+        pass
+
+
+class LxmlSerializer(object):
+    """Serialize by copying the odfpy nodes into an lxml tree."""
+
+    # Clark notation of odfpy qualified names, shared by all documents.
+    clarkNames = {}
+
+    def __init__(self, out):
+        self.out = out
+        self.root = None
+
+    def getClarkName(self, qname):
+        name = self.clarkNames.get(qname)
+        if name is None:
+            if isinstance(qname, tuple):
+                name = '{%s}%s' % qname
+            else:
+                name = qname
+            self.clarkNames[qname] = name
+        return name
+
+    def copy(self, node, parent, SubElement=lxml.etree.SubElement):
+        getClarkName = self.getClarkName
+        for child in node.childNodes:
+            if child.nodeType == Node.ELEMENT_NODE:
+                attributes = {getClarkName(name): str(value)
+                              for name, value in child.attributes.items()}
+                try:
+                    element = SubElement(
+                        parent, getClarkName(child.qname), attributes)
+                except ValueError:
+                    # Characters XML can't represent; odfpy replaces them.
+                    element = SubElement(
+                        parent, getClarkName(child.qname),
+                        {name: _handle_unrepresentable(value)
+                         for name, value in attributes.items()})
+                if child.childNodes:
+                    self.copy(child, element)
+            elif child.nodeType in (Node.TEXT_NODE,
+                                    Node.CDATA_SECTION_NODE):
+                self.addText(parent, child.data)
+
+    def addText(self, parent, data):
+        if len(parent):
+            last = parent[-1]
+            try:
+                last.tail = (last.tail or '') + data
+            except ValueError:
+                last.tail = (last.tail or '') + _handle_unrepresentable(data)
+        else:
+            try:
+                parent.text = (parent.text or '') + data
+            except ValueError:
+                parent.text = (parent.text or '') + \
+                    _handle_unrepresentable(data)
+
+    def start(self, node):
+        # Declare all namespaces on the root, as odfpy does.
+        nsmap = {prefix: namespace
+                 for namespace, prefix in Element.namespaces.items()}
+        self.root = lxml.etree.Element(
+            self.getClarkName(node.qname), nsmap=nsmap)
+        for name, value in node.attributes.items():
+            self.root.set(self.getClarkName(name), str(value))
+
+    def end(self, node):
+        pass
+
+    def write(self, node):
+        element = lxml.etree.SubElement(
+            self.root, self.getClarkName(node.qname),
+            {self.getClarkName(name): str(value)
+             for name, value in node.attributes.items()})
+        self.copy(node, element)
+
+    def close(self):
+        self.out.write(lxml.etree.tostring(
+            self.root, encoding='UTF-8', xml_declaration=True))
+        self.root = None
+
+
+SERIALIZERS = {
+    'odfpy': OdfpySerializer,
+    'lxml': LxmlSerializer,
+}
+
+
+def writeStyles(odf, serializer):
+    # Same as OpenDocument.stylesxml(), but streaming.
+    x = DocumentStyles()
+    serializer.start(x)
+    if odf.fontfacedecls.hasChildNodes():
+        serializer.write(odf.fontfacedecls)
+    serializer.write(odf.styles)
+    a = AutomaticStyles()
+    for style in getUsedAutomaticStyles(odf, [odf.masterstyles]):
+        a.childNodes.append(style)
+    serializer.write(a)
+    if odf.masterstyles.hasChildNodes():
+        serializer.write(odf.masterstyles)
+    serializer.end(x)
+    serializer.close()
+
+
+def writeContent(odf, serializer):
+    # Same as OpenDocument.contentxml(), but streaming.
+    x = DocumentContent()
+    serializer.start(x)
+    if odf.scripts.hasChildNodes():
+        serializer.write(odf.scripts)
+    if odf.fontfacedecls.hasChildNodes():
+        serializer.write(odf.fontfacedecls)
+    a = AutomaticStyles()
+    for style in getUsedAutomaticStyles(
+            odf, [odf.styles, odf.automaticstyles, odf.body]):
+        # Not addElement(), the styles stay where they are.
+        a.childNodes.append(style)
+    serializer.write(a)
+    serializer.write(odf.body)
+    serializer.end(x)
+    serializer.close()
+
+
+def writeDocument(odf, fileobj, serializer='odfpy'):
+    """Write the odfpy document ``odf`` as a package to ``fileobj``.
+
+    ``serializer`` is the name of the XML serializer to use, see
+    ``SERIALIZERS``. Returns the ``PackageWriter``, which knows the sizes
+    of all members.
+    """
+    factory = SERIALIZERS[serializer]
+    writer = PackageWriter(fileobj)
+    entries = manifest.Manifest()
+    entries.addElement(
+        manifest.FileEntry(fullpath='/', mediatype=odf.mimetype))
+    # The mimetype must come first and uncompressed, so that it can be
+    # sniffed at a fixed offset.
+    writer.writeMember('mimetype', odf.mimetype.encode('utf-8'),
+                       compress=False)
+
+    entries.addElement(
+        manifest.FileEntry(fullpath='styles.xml', mediatype='text/xml'))
+    with writer.openMember('styles.xml') as out:
+        writeStyles(odf, factory(out))
+
+    entries.addElement(
+        manifest.FileEntry(fullpath='content.xml', mediatype='text/xml'))
+    with writer.openMember('content.xml') as out:
+        writeContent(odf, factory(out))
+
+    if odf.settings.hasChildNodes():
+        entries.addElement(
+            manifest.FileEntry(fullpath='settings.xml', mediatype='text/xml'))
+        writer.writeMember('settings.xml', odf.settingsxml())
+
+    entries.addElement(
+        manifest.FileEntry(fullpath='meta.xml', mediatype='text/xml'))
+    writer.writeMember('meta.xml', odf.metaxml())
+
+    for arcname, (kind, data, mediatype) in odf.Pictures.items():
+        entries.addElement(
+            manifest.FileEntry(fullpath=arcname, mediatype=mediatype))
+        if kind == IS_FILENAME:
+            with open(data, 'rb') as picture:
+                data = picture.read()
+        writer.writeMember(arcname, data,
+                           compress=mediatype not in COMPRESSED_MEDIATYPES)
+
+    if odf.thumbnail is not None:
+        entries.addElement(
+            manifest.FileEntry(fullpath='Thumbnails/', mediatype=''))
+        entries.addElement(manifest.FileEntry(
+            fullpath='Thumbnails/thumbnail.png', mediatype=''))
+        writer.writeMember('Thumbnails/thumbnail.png', odf.thumbnail)
+
+    with writer.openMember('META-INF/manifest.xml') as out:
+        out.write(XMLPROLOGUE)
+        entries.toXml(0, out)
+    writer.close()
+    return writer
+
+
+@contextlib.contextmanager
+def inlinedPictures(odf):
+    """Embed the package pictures into their ``draw:image`` elements.
+
+    A flat document has no package, so while the context is active the
+    images carry their data as ``office:binary-data`` instead of referring
+    to ``Pictures/``. Every picture is encoded only once.
+    """
+    encoded = {}
+    inlined = []
+    for top in (odf.styles, odf.masterstyles, odf.body):
+        for image in top.getElementsByType(DrawImage):
+            href = image.attributes.get(XLINK_HREF)
+            if href not in odf.Pictures:
+                continue
+            if href not in encoded:
+                kind, data, mediatype = odf.Pictures[href]
+                if kind == IS_FILENAME:
+                    with open(data, 'rb') as picture:
+                        data = picture.read()
+                encoded[href] = base64.b64encode(data).decode('ascii')
+            binaryData = BinaryData()
+            binaryData.appendChild(Text(encoded[href]))
+            # Bypass the DOM methods, the document caches must not change.
+            del image.attributes[XLINK_HREF]
+            image.childNodes.append(binaryData)
+            inlined.append((image, href, binaryData))
+    try:
+        yield
+    finally:
+        for image, href, binaryData in inlined:
+            image.childNodes.remove(binaryData)
+            image.attributes[XLINK_HREF] = href
+
+
+def writeFlatDocument(odf, fileobj, serializer='odfpy'):
+    """Write the odfpy document ``odf`` as flat XML (FODT) to ``fileobj``.
+
+    All parts of the package go into one ``office:document`` element, in
+    the order of the ODF schema. Returns the ``StreamOutput``, which knows
+    the size of the document.
+    """
+    with inlinedPictures(odf):
+        return _writeFlatDocument(odf, fileobj, serializer)
+
+
+def _writeFlatDocument(odf, fileobj, serializer):
+    out = StreamOutput(fileobj)
+    serializer = SERIALIZERS[serializer](out)
+    x = Document(mimetype=odf.mimetype)
+    serializer.start(x)
+    serializer.write(odf.meta)
+    if odf.settings.hasChildNodes():
+        serializer.write(odf.settings)
+    if odf.scripts.hasChildNodes():
+        serializer.write(odf.scripts)
+    if odf.fontfacedecls.hasChildNodes():
+        serializer.write(odf.fontfacedecls)
+    serializer.write(odf.styles)
+    a = AutomaticStyles()
+    for style in getUsedAutomaticStyles(
+            odf, [odf.styles, odf.automaticstyles, odf.masterstyles,
+                  odf.body]):
+        a.childNodes.append(style)
+    serializer.write(a)
+    if odf.masterstyles.hasChildNodes():
+        serializer.write(odf.masterstyles)
+    serializer.write(odf.body)
+    serializer.end(x)
+    serializer.close()
+    out.close()
+    return out
+
+
+# Output formats and the functions writing them.
+FORMATS = {
+    'odt': writeDocument,
+    'fodt': writeFlatDocument,
+}